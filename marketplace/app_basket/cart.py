@@ -3,8 +3,11 @@
 from decimal import Decimal
 
 from app_users.models import Buyer, Profile
+from app_merch.discount_service import DiscountService
 from app_merch.models import Offer
+from app_settings import cache_tags
 from django.db.models import F
+from django.utils.functional import cached_property
 from . import models
 
 
@@ -13,6 +16,14 @@ class ItemDoesNotExist(Exception):
 
 
 CART_ID = "cart_id"
+CART_PRICES_TAG = "cart-prices"
+
+
+def invalidate_cart_prices():
+    """
+    Сбрасываем закешированные стоимости всех корзин (при изменении цен или скидок)
+    """
+    cache_tags.invalidate_tags(CART_PRICES_TAG)
 
 
 class CartService:
@@ -20,22 +31,22 @@ class CartService:
     Класс корзины товаров
     """
 
-    def __init__(self, request):
+    prices_cache_time = 60 * 15
+
+    def __init__(self, request, create=True):
         """
-        Инициализируем корзину: ищем уже существующую или создаем ее методом cart_new
+        Инициализируем корзину: ищем уже существующую или создаем ее методом cart_new.
+        При create=False новая корзина не создается до добавления в нее первого товара
         """
+        self.request = request
         if request.user.is_anonymous:
             cart_id = request.session.get(CART_ID)
-            if cart_id:
-                cart = models.Cart.objects.filter(id=int(cart_id)).first()
-                if cart is None:
-                    cart = self.cart_new(request)
-            else:
-                cart = self.cart_new(request)
+            cart = models.Cart.objects.filter(id=int(cart_id)).first() if cart_id else None
         else:
             cart = models.Cart.objects.filter(buyer__profile__user=request.user).first()
-            if cart is None:
-                cart = self.cart_new(request)
+
+        if cart is None and create:
+            cart = self.cart_new(request)
 
         self.cart = cart
 
@@ -59,6 +70,8 @@ class CartService:
         """
         Добавляем товар в корзину
         """
+        if self.cart is None:
+            self.cart = self.cart_new(self.request)
         cart_item = models.CartItem.objects.filter(cart=self.cart, offer=offer).first()
         if cart_item:
             cart_item.quantity += 1
@@ -67,6 +80,7 @@ class CartService:
             models.CartItem.objects.create(
                 offer=offer, cart=self.cart, quantity=quantity
             )
+        self.cart.bump_revision()
 
     def delete_cartitem(self, cartitem_id):
         """
@@ -75,6 +89,7 @@ class CartService:
         cart_item = models.CartItem.objects.filter(id=cartitem_id)
         if cart_item:
             cart_item.delete()
+            self.cart.bump_revision()
         else:
             raise ItemDoesNotExist
 
@@ -85,13 +100,16 @@ class CartService:
         cart_item = models.CartItem.objects.filter(id=cartitem_id).first()
         cart_item.quantity = quantity
         cart_item.save()
+        self.cart.bump_revision()
 
     def get_cart_item_list(self):
         """
         Получаем список товаров в корзине. Каждый объект товара аннотируем полем с количеством этого товара в корзине и id этого товара в корзине
         """
-        offers_from_cart = Offer.objects.filter(cart_item__cart=self.cart).annotate(
-            amount=F('cart_item__quantity'), item_pk=F('cart_item__id'))
+        if self.cart is None:
+            return Offer.objects.none()
+        offers_from_cart = Offer.objects.filter(cart_item__cart=self.cart).select_related(
+            'product__icon', 'seller').annotate(amount=F('cart_item__quantity'), item_pk=F('cart_item__id'))
 
         return offers_from_cart
 
@@ -99,4 +117,53 @@ class CartService:
         """
         Получаем общее количество товара в корзине
         """
+        if self.cart is None:
+            return 0
         return models.CartItem.objects.filter(cart=self.cart).count()
+
+    def get_prices(self):
+        """
+        Получаем стоимость корзины с учетом скидок на продукты и итоговую стоимость с учетом всех скидок.
+        Результат кешируется по ревизии корзины и версии цен, поэтому повторный расчет
+        происходит только после изменения корзины, цен или скидок
+        """
+        if self.cart is None:
+            return {"price": Decimal("0.00"), "price_after_discount": Decimal("0.00")}
+
+        return cache_tags.get_or_set(
+            f"Cart {self.cart.pk} prices {self.cart.revision}",
+            self.calculate_prices,
+            self.prices_cache_time,
+            tags=[CART_PRICES_TAG],
+        )
+
+    def calculate_prices(self):
+        result = DiscountService().calculate_cart(self.cart)
+        return {"price": result.subtotal, "price_after_discount": result.total}
+
+
+class LazyCart:
+    """
+    Ленивая корзина для шаблонов: корзина ищется в БД, а ее стоимость рассчитывается
+    только при первом обращении шаблона к соответствующему значению
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def service(self):
+        return CartService(self.request, create=False)
+
+    @cached_property
+    def prices(self):
+        return self.service.get_prices()
+
+    def get_cart_item_quantity(self):
+        return self.service.get_cart_item_quantity()
+
+    def get_price(self):
+        return self.prices["price"]
+
+    def get_price_after_discount(self):
+        return self.prices["price_after_discount"]
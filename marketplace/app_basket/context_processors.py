@@ -1,16 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
-from .cart import CartService
-from app_merch.discount_service import DiscountService
+from .cart import LazyCart
 
 def cart(request):
-    """Контекст-процессор, инициализирующий сервис корзины товаров и делающий доступным его всем шаблонам"""
+    """
+    Контекст-процессор, делающий корзину товаров доступной всем шаблонам.
+    Корзина и ее стоимость загружаются лениво, только если шаблон к ним обращается
+    """
 
     if request.user.is_superuser:
         return {"cart": [], "price": 0}
     else:
-        cart = CartService(request)
-        ds = DiscountService()
-        price = ds.get_total_price_cart(cart.cart)
-        price2 = ds.get_total_price_cart_with_all_discounts(cart.cart)
-        return {"cart": CartService(request), "price": price, "price_after_discount": price2}
+        cart = LazyCart(request)
+        return {"cart": cart, "price": cart.get_price, "price_after_discount": cart.get_price_after_discount}
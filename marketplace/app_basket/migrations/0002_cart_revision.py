@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_basket', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, verbose_name='ревизия'),
+        ),
+    ]
@@ -18,6 +18,7 @@ class Cart(models.Model):
         related_name="cart",
         verbose_name="покупатель",
     )
+    revision = models.PositiveIntegerField(default=0, verbose_name="ревизия")
 
     class Meta:
         verbose_name = "Корзина"
@@ -35,6 +36,13 @@ class Cart(models.Model):
         """
         return sum(item.quantity for item in self.cart_item.all())
 
+    def bump_revision(self):
+        """
+        Увеличивает ревизию корзины после изменения её содержимого.
+        """
+        Cart.objects.filter(pk=self.pk).update(revision=models.F("revision") + 1)
+        self.revision += 1
+
 
 class CartItem(models.Model):
     """
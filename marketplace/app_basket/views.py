@@ -13,21 +13,20 @@ def get_cart(request):
     """
     View получения корзины товаров юзера на странице сайта
     """
-    cart_user = CartService(request)
-    ds = DiscountService()
-    # получаем список offers из корзины, каждый объект товара аннотирован полем с количеством этого товара в корзине и id этого товара в корзине
-    offers = cart_user.get_cart_item_list()
-    data_from_cart = ds.get_data_from_cart(offers)
-    discount, total_price_after_cart_discount = ds.apply_cart_discount(cart_user.cart)
-    discount_info, total_price_after_set_discount = ds.apply_set_discounts(cart_user.cart)
-
-    if discount == 0 and not discount_info:
-        return render(request, "cart.html", context={"cart_user": data_from_cart, "discount_cart": None, "discount": 0, "total_price": total_price_after_cart_discount})
-    if total_price_after_cart_discount < total_price_after_set_discount:
-        return render(request, "cart.html", context={"cart_user": data_from_cart, "discount_cart": True, "discount": discount, "total_price": total_price_after_cart_discount})
+    cart_user = CartService(request, create=False)
+    if cart_user.cart is None:
+        return render(request, "cart.html", context={"cart_user": [], "discount_cart": None, "discount": 0, "total_price": 0})
+    # рассчитываем позиции корзины и все скидки за один проход
+    result = DiscountService().calculate_cart(cart_user.cart)
+    context = {"cart_user": result.lines, "price": result.subtotal, "total_price": result.total}
+
+    if not result.has_discount:
+        context.update({"discount_cart": None, "discount": 0})
+    elif result.is_cart_discount_applied:
+        context.update({"discount_cart": True, "discount": result.cart_discount})
     else:
-        return render(request, "cart.html", context={"cart_user": data_from_cart, "discount_cart": False, "discount": discount_info, "total_price": total_price_after_set_discount})
-
+        context.update({"discount_cart": False, "discount": result.set_discount})
+    return render(request, "cart.html", context=context)
 
 
 def add_to_cart(request):
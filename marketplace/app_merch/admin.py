@@ -2,8 +2,8 @@ from django.contrib import admin
 from django.template.defaultfilters import truncatechars
 from django_mptt_admin.admin import DjangoMpttAdmin
 
-from .models import (Banner, Category, Discount, Image, Offer, Product,
-                     SetOfProducts, ProductGroup, Tag, SetDiscount, CartDiscount)
+from .models import (Banner, Category, Discount, Image, ImportChunk, ImportJob, ImportRowError,
+                     Offer, Product, SetOfProducts, ProductGroup, Tag, SetDiscount, CartDiscount)
 
 
 @admin.register(Image)
@@ -33,8 +33,10 @@ class TagAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     """ Регистрация модели продуктов в админ-панели. """
 
-    search_fields = ["title"]
+    search_fields = ["title", "sku"]
     list_display = ["title", "category"]
+    # Просмотры накапливает счетчик просмотров, форма не должна их перезаписывать.
+    readonly_fields = ["total_views"]
 
 
 @admin.register(SetOfProducts)
@@ -114,6 +116,7 @@ class BannerAdmin(admin.ModelAdmin):
         "primary_text",
         "short_description",
         "is_active",
+        "weight",
         "link"
     ]
     list_filter = ["is_active"]
@@ -122,3 +125,45 @@ class BannerAdmin(admin.ModelAdmin):
     @staticmethod
     def short_description(obj):
         return truncatechars(obj.description, 50)
+
+
+class ImportChunkInline(admin.TabularInline):
+    """ Части файлов на странице задания импорта. """
+
+    model = ImportChunk
+    extra = 0
+    can_delete = False
+    fields = [
+        "filepath",
+        "first_index",
+        "total",
+        "next_index",
+        "created",
+        "updated",
+        "unchanged",
+        "errors",
+        "status",
+    ]
+    readonly_fields = fields
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """ Регистрация модели заданий импорта в админ-панели. """
+
+    list_display = ["id", "status", "mode", "created_at", "finished_at"]
+    list_filter = ["status"]
+    readonly_fields = ["files", "status", "deactivated", "email_sent", "message", "finished_at"]
+    inlines = [ImportChunkInline]
+
+
+@admin.register(ImportRowError)
+class ImportRowErrorAdmin(admin.ModelAdmin):
+    """ Регистрация модели ошибок импорта в админ-панели. """
+
+    list_display = ["job", "filepath", "index", "short_message"]
+    list_filter = ["job"]
+
+    @staticmethod
+    def short_message(obj):
+        return truncatechars(obj.message, 80)
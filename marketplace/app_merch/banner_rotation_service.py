@@ -0,0 +1,101 @@
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from app_settings import cache_tags
+from .models import Banner
+
+
+class BannerRotationService:
+    """
+    Сервис ротации баннеров.
+    В кеше хранится пул активных баннеров: id, накопленные суммы их весов и метка пула.
+    Показываемые баннеры выбираются из пула случайно с учетом веса без обращения к БД
+    двоичным поиском по накопленным весам, сами баннеры кешируются по отдельности
+    под ключами с меткой пула, поэтому после изменения любого баннера пул и баннеры перечитываются.
+    """
+
+    pool_key = "Banners rotation pool"
+    tag = "banners"
+    cache_time = 60 * 60 * 24
+    # Во сколько раз количество случайных попыток может превышать количество выбираемых баннеров.
+    draws_factor = 4
+
+    def get_pool(self, cache_time: Optional[int] = None) -> dict:
+        """ Метод получения пула активных баннеров. """
+
+        return cache_tags.get_or_set(
+            self.pool_key, self.build_pool, cache_time or self.cache_time, tags=[self.tag]
+        )
+
+    def build_pool(self) -> dict:
+        ids, cumulative_weights = self.make_cumulative_weights(
+            Banner.objects.filter(is_active=True, weight__gt=0).order_by("pk").values_list("pk", "weight")
+        )
+        return {"token": uuid4().hex, "ids": ids, "cumulative_weights": cumulative_weights}
+
+    @staticmethod
+    def make_cumulative_weights(banners: Iterable[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+        """ Метод получения списков id баннеров и накопленных сумм их весов. """
+
+        banners = list(banners)
+        return [pk for pk, _ in banners], list(accumulate(weight for _, weight in banners))
+
+    def sample(self, ids: List[int], cumulative_weights: List[int], count: int) -> List[int]:
+        """
+        Метод взвешенной выборки id баннеров без повторений.
+        Баннер выбирается двоичным поиском случайного числа в накопленных весах,
+        повторно выбранный баннер отбрасывается, что равносильно выбору из оставшихся баннеров.
+        Если попытки не дают новых баннеров (один баннер намного тяжелее остальных),
+        накопленные веса пересчитываются без уже выбранных баннеров.
+        """
+
+        count = min(count, len(ids))
+        chosen = {}
+        for _ in range(count * self.draws_factor):
+            if len(chosen) == count:
+                return list(chosen)
+            index = bisect_right(cumulative_weights, random.random() * cumulative_weights[-1])
+            chosen[ids[index]] = None
+
+        if len(chosen) == count:
+            return list(chosen)
+        remaining = [
+            (pk, weight - (cumulative_weights[index - 1] if index else 0))
+            for index, (pk, weight) in enumerate(zip(ids, cumulative_weights))
+            if pk not in chosen
+        ]
+        return list(chosen) + self.sample(
+            *self.make_cumulative_weights(remaining), count - len(chosen)
+        )
+
+    def get_banners(self, count: int, cache_time: Optional[int] = None) -> List[Banner]:
+        """ Метод получения баннеров для показа. """
+
+        pool = self.get_pool(cache_time)
+        banner_ids = self.sample(pool["ids"], pool["cumulative_weights"], count)
+        keys = {pk: f"Banner {pk} {pool['token']}" for pk in banner_ids}
+
+        cached = cache.get_many(list(keys.values()))
+        banners = {pk: cached[key] for pk, key in keys.items() if key in cached}
+        missing = [pk for pk in banner_ids if pk not in banners]
+        if missing:
+            loaded = Banner.objects.select_related("file").in_bulk(missing)
+            cache.set_many(
+                {keys[pk]: banner for pk, banner in loaded.items()}, cache_time or self.cache_time
+            )
+            banners.update(loaded)
+
+        return [banners[pk] for pk in banner_ids if pk in banners]
+
+    def invalidate(self) -> None:
+        """ Метод сброса пула баннеров. """
+
+        cache_tags.invalidate_tags(self.tag)
+
+
+banner_rotation_service = BannerRotationService()
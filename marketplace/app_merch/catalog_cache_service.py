@@ -0,0 +1,78 @@
+import hashlib
+from typing import Any, Callable, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from app_settings import cache_tags
+
+CATALOG_PAGE_PARAMS = (
+    "cat",
+    "created_at_sort",
+    "cursor",
+    "delivery_free",
+    "in_stock",
+    "page",
+    "price",
+    "price_sort",
+    "reviews_sort",
+    "tag",
+    "title",
+    "views_sort",
+)
+
+
+class CatalogCacheService:
+    """
+    Сервис кеширования страниц каталога.
+    Страница хранится в виде вычисленных строк и данных пагинации под ключом,
+    полученным из нормализованных параметров запроса. Все страницы сбрасываются
+    сбросом тега каталога при изменении индекса каталога.
+    Просмотры меняют индекс постоянно и тег не сбрасывают, поэтому страницы
+    с сортировкой по просмотрам кешируются только на период сброса просмотров.
+    """
+
+    tag = "catalog"
+    cache_time = 60 * 60 * 24
+
+    def invalidate(self) -> None:
+        """ Метод сброса всех закешированных страниц и фасетов каталога. """
+
+        cache_tags.invalidate_tags(self.tag)
+
+    @staticmethod
+    def make_params_key(params) -> str:
+        """
+        Метод получения ключа параметров страницы, не зависящего от их порядка,
+        пустых и посторонних параметров. Пустой курсор значим: он включает курсорную пагинацию.
+        """
+
+        normalized = sorted(
+            (param, params.get(param))
+            for param in CATALOG_PAGE_PARAMS
+            if params.get(param) or (param == "cursor" and param in params)
+        )
+        return hashlib.md5(urlencode(normalized).encode()).hexdigest()
+
+    @property
+    def views_cache_time(self) -> int:
+        return getattr(settings, "VIEW_COUNTER_FLUSH_INTERVAL", 60)
+
+    def get_or_set(
+        self, key: str, calculate: Callable[[], Any], cache_time: Optional[int] = None
+    ) -> Any:
+        """ Метод получения значения, закешированного до изменения каталога. """
+
+        return cache_tags.get_or_set(key, calculate, cache_time or self.cache_time, tags=[self.tag])
+
+    def get_page(self, params, calculate: Callable[[], dict]) -> dict:
+        """ Метод получения данных страницы каталога по параметрам запроса. """
+
+        return self.get_or_set(
+            f"Catalog page {self.make_params_key(params)}",
+            calculate,
+            self.views_cache_time if params.get("views_sort") else None,
+        )
+
+
+catalog_cache_service = CatalogCacheService()
@@ -0,0 +1,129 @@
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Min, Q, When
+
+from .catalog_cache_service import catalog_cache_service
+from .models import CatalogIndex, Category, Offer, Product, ProductPriceSummary
+
+
+class CatalogIndexService:
+    """ Сервис для построения индекса каталога. """
+
+    batch_size = 500
+
+    def rebuild(self, product_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Метод пересчета строк индекса для переданных продуктов.
+        Если продукты не переданы, индекс перестраивается полностью.
+        Возвращает количество продуктов в пересчитанной части индекса.
+        """
+
+        if product_ids is None:
+            product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+        else:
+            product_ids = sorted({pk for pk in product_ids if pk})
+
+        indexed = 0
+        for start in range(0, len(product_ids), self.batch_size):
+            indexed += self.rebuild_batch(product_ids[start:start + self.batch_size])
+
+        return indexed
+
+    def rebuild_batch(self, product_ids: List[int]) -> int:
+        """ Метод пересчета строк индекса для пачки продуктов. """
+
+        offers_data = {
+            data["product_id"]: data
+            for data in Offer.objects.filter(product_id__in=product_ids, is_active=True)
+            .values("product_id")
+            .annotate(
+                min_price=Min("price"),
+                max_price=Max("price"),
+                any_in_stock=Max(
+                    Case(When(quantity__gt=0, then=1), default=0, output_field=IntegerField())
+                ),
+                any_free_delivery=Max(
+                    Case(When(is_delivery_free=True, then=1), default=0, output_field=IntegerField())
+                ),
+            )
+        }
+        summaries = ProductPriceSummary.objects.in_bulk(product_ids)
+        products = (
+            Product.objects.filter(pk__in=offers_data.keys(), is_active=True)
+            .select_related("category", "icon")
+            .prefetch_related("tags")
+        )
+
+        rows = []
+        row_tags = []
+        for product in products:
+            data = offers_data[product.pk]
+            summary = summaries.get(product.pk)
+            rows.append(
+                CatalogIndex(
+                    product=product,
+                    title=product.title,
+                    icon_file=product.icon.file.name if product.icon else "",
+                    created_at=product.created_at,
+                    category=product.category,
+                    category_title=product.category.title,
+                    category_tree_id=product.category.tree_id,
+                    category_lft=product.category.lft,
+                    category_rght=product.category.rght,
+                    min_price=data["min_price"],
+                    max_price=data["max_price"],
+                    avg_price=summary.avg_price if summary else None,
+                    avg_discount_price=summary.avg_discount_price if summary else None,
+                    has_discount=summary.has_active_discount if summary else False,
+                    any_in_stock=bool(data["any_in_stock"]),
+                    any_free_delivery=bool(data["any_free_delivery"]),
+                    total_views=product.total_views,
+                    review_count=summary.review_count if summary else 0,
+                )
+            )
+            row_tags.extend(
+                CatalogIndex.tags.through(catalogindex_id=product.pk, tag_id=tag.pk)
+                for tag in product.tags.all()
+            )
+
+        with transaction.atomic():
+            CatalogIndex.objects.filter(product_id__in=product_ids).delete()
+            CatalogIndex.objects.bulk_create(rows)
+            CatalogIndex.tags.through.objects.bulk_create(row_tags)
+        catalog_cache_service.invalidate()
+
+        return len(rows)
+
+    @staticmethod
+    def refresh_categories(tree_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Метод обновления данных категорий в индексе.
+        При изменении дерева категорий смещаются границы и соседних категорий,
+        поэтому проверяются все категории переданных деревьев (если деревья не переданы - всех),
+        а обновляются строки только тех категорий, данные которых в индексе устарели.
+        """
+
+        index = CatalogIndex.objects.all()
+        if tree_ids is not None:
+            index = index.filter(Q(category__tree_id__in=tree_ids) | Q(category_tree_id__in=tree_ids))
+        stale_category_ids = index.exclude(
+            category_title=F("category__title"),
+            category_tree_id=F("category__tree_id"),
+            category_lft=F("category__lft"),
+            category_rght=F("category__rght"),
+        ).values("category_id")
+
+        updated = 0
+        for category in Category.objects.filter(pk__in=stale_category_ids):
+            updated += CatalogIndex.objects.filter(category=category).update(
+                category_title=category.title,
+                category_tree_id=category.tree_id,
+                category_lft=category.lft,
+                category_rght=category.rght,
+            )
+        if updated:
+            catalog_cache_service.invalidate()
+
+
+catalog_index_service = CatalogIndexService()
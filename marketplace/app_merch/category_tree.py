@@ -0,0 +1,183 @@
+"""
+Дерево категорий в памяти процесса.
+Таблица категорий загружается одним запросом в компактные массивы, упорядоченные
+по (tree_id, lft), поэтому потомки узла занимают непрерывный отрезок массивов сразу за ним.
+Дерево хранится в процессе и перестраивается при сбросе тега кеша 'categories',
+который сбрасывается при сохранении и удалении категорий в любом процессе.
+"""
+
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app_settings import cache_tags
+
+from .models import Category
+
+
+@dataclass(frozen=True)
+class CategoryNode:
+    """ Узел дерева категорий. """
+
+    id: int
+    parent_id: Optional[int]
+    slug: str
+    title: str
+    icon: str
+    level: int
+    tree_id: int
+    lft: int
+    rght: int
+    children: Tuple["CategoryNode", ...] = ()
+
+
+class CategoryTree:
+    """ Компактное представление дерева категорий. """
+
+    def __init__(self, rows):
+        self.ids = array("q")
+        self.parents = array("l")
+        self.tree_ids = array("l")
+        self.lfts = array("l")
+        self.rghts = array("l")
+        self.levels = array("h")
+        self.active = bytearray()
+        self.slugs: List[str] = []
+        self.titles: List[str] = []
+        self.icons: List[str] = []
+
+        positions: Dict[int, int] = {}
+        parent_ids = []
+        for pk, parent_id, slug, title, icon, level, tree_id, lft, rght, is_active in rows:
+            positions[pk] = len(self.ids)
+            parent_ids.append(parent_id)
+            self.ids.append(pk)
+            self.tree_ids.append(tree_id)
+            self.lfts.append(lft)
+            self.rghts.append(rght)
+            self.levels.append(level)
+            self.active.append(is_active)
+            self.slugs.append(slug)
+            self.titles.append(title)
+            self.icons.append(icon or "")
+
+        for parent_id in parent_ids:
+            self.parents.append(positions.get(parent_id, -1))
+
+        self.slug_positions = {slug: position for position, slug in enumerate(self.slugs)}
+        self.menu = self.build_menu()
+
+    @classmethod
+    def load(cls) -> "CategoryTree":
+        """ Метод загрузки дерева категорий одним запросом. """
+
+        return cls(
+            Category.objects.order_by("tree_id", "lft").values_list(
+                "pk", "parent_id", "slug", "title", "icon__file",
+                "level", "tree_id", "lft", "rght", "is_active",
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def make_node(self, position: int, children: Tuple[CategoryNode, ...] = ()) -> CategoryNode:
+        parent = self.parents[position]
+        return CategoryNode(
+            id=self.ids[position],
+            parent_id=self.ids[parent] if parent >= 0 else None,
+            slug=self.slugs[position],
+            title=self.titles[position],
+            icon=self.icons[position],
+            level=self.levels[position],
+            tree_id=self.tree_ids[position],
+            lft=self.lfts[position],
+            rght=self.rghts[position],
+            children=children,
+        )
+
+    def get_node(self, slug: str) -> Optional[CategoryNode]:
+        """ Метод получения категории по slug. """
+
+        position = self.slug_positions.get(slug)
+        return None if position is None else self.make_node(position)
+
+    def get_subtree_end(self, position: int) -> int:
+        """ Метод получения позиции, следующей за последним потомком узла. """
+
+        end = position + 1
+        while (
+            end < len(self.ids)
+            and self.tree_ids[end] == self.tree_ids[position]
+            and self.lfts[end] < self.rghts[position]
+        ):
+            end += 1
+        return end
+
+    def get_descendant_ids(self, slug: str, include_self: bool = True) -> List[int]:
+        """ Метод получения id категории и всех ее потомков. """
+
+        position = self.slug_positions.get(slug)
+        if position is None:
+            return []
+        start = position if include_self else position + 1
+        return list(self.ids[start:self.get_subtree_end(position)])
+
+    def get_breadcrumbs(self, slug: str) -> List[CategoryNode]:
+        """ Метод получения пути от корневой категории до переданной. """
+
+        position = self.slug_positions.get(slug)
+        breadcrumbs = []
+        while position is not None and position >= 0:
+            breadcrumbs.append(self.make_node(position))
+            position = self.parents[position]
+        return breadcrumbs[::-1]
+
+    def build_menu(self) -> Tuple[CategoryNode, ...]:
+        """
+        Метод построения меню категорий.
+        В меню попадают активные категории, все предки которых тоже активны.
+        """
+
+        def build(start: int, end: int) -> Tuple[CategoryNode, ...]:
+            nodes = []
+            position = start
+            while position < end:
+                subtree_end = self.get_subtree_end(position)
+                if self.active[position]:
+                    nodes.append(self.make_node(position, build(position + 1, subtree_end)))
+                position = subtree_end
+            return tuple(nodes)
+
+        return build(0, len(self.ids))
+
+
+class CategoryTreeService:
+    """ Сервис получения дерева категорий, общего для всех запросов процесса. """
+
+    tag = "categories"
+
+    def __init__(self):
+        self._tree: Optional[CategoryTree] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get_tree(self) -> CategoryTree:
+        """ Метод получения дерева категорий, актуального для текущей версии тега категорий. """
+
+        version = cache_tags.get_tag_versions([self.tag])[self.tag]
+        if self._tree is None or self._version != version:
+            with self._lock:
+                if self._tree is None or self._version != version:
+                    self._tree = CategoryTree.load()
+                    self._version = version
+        return self._tree
+
+    def invalidate(self) -> None:
+        """ Метод сброса дерева категорий во всех процессах. """
+
+        cache_tags.invalidate_tags(self.tag)
+
+
+category_tree_service = CategoryTreeService()
@@ -0,0 +1,156 @@
+import base64
+import json
+from typing import List, Optional, Sequence
+
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class CountedPaginator(Paginator):
+    """
+    Стандартный пагинатор с заранее известным количеством объектов,
+    например, из фасетов каталога, вместо отдельного запроса COUNT.
+    """
+
+    def __init__(self, object_list, per_page, count: int, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self) -> int:
+        return self.known_count
+
+
+class CursorPage:
+    """ Страница курсорной пагинации. """
+
+    def __init__(
+        self, object_list: list, next_cursor: Optional[str], previous_cursor: Optional[str]
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу (keyset): страница выбирается условием
+    "строки после последней строки предыдущей страницы" по полям сортировки и pk,
+    поэтому стоимость запроса не растет с номером страницы, как при OFFSET.
+    Сортировка queryset должна заканчиваться полем pk, а строки queryset
+    должны быть словарями, содержащими все поля сортировки.
+    """
+
+    def __init__(
+        self, queryset: QuerySet, per_page: int, ordering: Sequence[str], count: Optional[int] = None
+    ):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.count = count
+
+    def page(self, cursor: str) -> CursorPage:
+        """
+        Метод получения страницы по курсору.
+        Пустой курсор или курсор, полученный при другой сортировке, открывает первую страницу.
+        """
+
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is not None and position["ordering"] != self.ordering:
+            position = None
+
+        is_backward = bool(position and position["backward"])
+        ordering = self.reverse_ordering() if is_backward else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, position["values"]))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if is_backward:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows, None, None)
+
+        has_next = has_more if not is_backward else True
+        has_previous = (has_more if is_backward else True) if position is not None else False
+        return CursorPage(
+            rows,
+            self.encode_cursor(rows[-1], backward=False) if has_next else None,
+            self.encode_cursor(rows[0], backward=True) if has_previous else None,
+        )
+
+    def reverse_ordering(self) -> List[str]:
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering]
+
+    def get_position_filter(self, ordering: List[str], values: list) -> Q:
+        """
+        Метод построения условия выборки строк после позиции курсора:
+        (a > x) OR (a = x AND b > y) OR ... с учетом направления каждого поля.
+        """
+
+        position_filter = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            position_filter |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return position_filter
+
+    def encode_cursor(self, row: dict, backward: bool) -> str:
+        """ Метод кодирования позиции строки в курсор. """
+
+        payload = {
+            "ordering": self.ordering,
+            "values": [row[field.lstrip("-")] for field in self.ordering],
+            "backward": backward,
+        }
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def to_python(self, name: str, value):
+        """ Метод приведения значения из курсора к типу поля модели, значения аннотаций не меняются. """
+
+        opts = self.queryset.model._meta
+        if name == "pk":
+            return opts.pk.to_python(value)
+        if name in self.queryset.query.annotations:
+            return value
+        return opts.get_field(name).to_python(value)
+
+    def decode_cursor(self, cursor: str) -> dict:
+        """ Метод декодирования курсора, значения полей приводятся к типам полей модели. """
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            ordering = payload["ordering"]
+            if len(payload["values"]) != len(ordering):
+                raise ValueError
+            values = [
+                self.to_python(field.lstrip("-"), value)
+                for field, value in zip(ordering, payload["values"])
+            ]
+        except Exception:
+            raise InvalidPage("Invalid cursor")
+
+        return {"ordering": ordering, "values": values, "backward": bool(payload.get("backward"))}
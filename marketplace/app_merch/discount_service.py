@@ -1,12 +1,14 @@
+from dataclasses import dataclass
 from decimal import Decimal
 from itertools import chain
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
-from django.db.models import Avg, Count, Max, Q
+from django.db.models import Avg, Count, Max, Q, QuerySet
 from django.utils import timezone
 
-from .models import Discount, Offer, Product, SetDiscount, SetOfProducts, ProductGroup
+from .models import CartDiscount, Discount, Offer
+from .set_discount_service import SetOfProductsRule, set_discount_service
 from django.db.models import F
 
 
@@ -14,9 +16,13 @@ class DiscountService:
     def calculate_average_price(self, offers):
         """
         Метод для расчета средней цены на основе списка предложений.
+        Для уже загруженного списка предложений расчет выполняется без запроса к БД.
         """
 
-        return offers.aggregate(Avg("price"))["price__avg"]
+        if isinstance(offers, QuerySet):
+            return offers.aggregate(Avg("price"))["price__avg"]
+        prices = [offer.price for offer in offers]
+        return sum(prices) / len(prices) if prices else None
 
     def calculate_price_with_discount(self, offer, discount):
         """
@@ -29,19 +35,31 @@ class DiscountService:
         )
         return offer_price_with_discount
 
-    def get_offers_with_and_without_discount(self, offers):
+    def get_active_discounts(self, product_ids: Iterable[int]) -> Dict[int, Discount]:
+        """
+        Метод для получения активных скидок на продукты одним запросом.
+        Возвращает словарь вида {id продукта: скидка}.
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return {}
+        discounts = Discount.objects.filter(product_id__in=product_ids, is_active=True)
+        return {discount.product_id: discount for discount in discounts}
+
+    def get_offers_with_and_without_discount(self, offers, discounts=None):
         """
         Метод для получения списка предложений со скидками и без скидок на основе списка предложений.
+        Скидки на все продукты из списка загружаются одним запросом,
+        либо могут быть переданы заранее в виде словаря {id продукта: скидка}.
         """
-        current_time = timezone.now()
+        offers = list(offers)
+        if discounts is None:
+            discounts = self.get_active_discounts(offer.product_id for offer in offers)
+
         offers_with_discount, offers_without_discount = [], []
         for offer in offers:
-            discounts = Discount.objects.filter(
-                product=offer.product,
-                is_active=True,
-            )
-            if discounts.exists():
-                discount = discounts.first()
+            discount = discounts.get(offer.product_id)
+            if discount:
                 offer_price_with_discount = self.calculate_price_with_discount(
                     offer, discount
                 )
@@ -102,85 +120,56 @@ class DiscountService:
              for item in combined_offers_from_cart]
         return cart_data
 
-    def get_total_price_cart(self, cart):
-        """
-        Получаем общую стоимость корзины с учетом скидок на продукты
-        """
-        offers_from_cart = Offer.objects.filter(cart_item__cart=cart).annotate(amount=F('cart_item__quantity'),
-                                                                                    item_pk=F('cart_item__id'))
-        data_from_cart = self.get_data_from_cart(offers_from_cart)
-        summ = Decimal(sum((item['total_price'] for item in data_from_cart))).quantize(Decimal('1.00'))
-
-        return summ
-
-    def apply_set_discounts(self, cart):
-        """
-        Применение скидки на продуктовый набор
-        """
-        # получаем список наборов продуктов, которые есть в корзине
-        sets_of_products_in_cart = SetOfProducts.objects.filter(product_groups__products__in=Product.objects.filter(offers__cart_item__cart=cart).distinct()).distinct()
-        # создаем лист данных, куда будем записывать данные по продуктовым наборам в виде {продуктовый набор: сумма скидки}
-        set_and_discount = {}
-        for set in sets_of_products_in_cart:
-            # для каждого продуктового набора определяем группы продуктов
-            groups_in_set_of_products = ProductGroup.objects.filter(set_of_products=set)
-            # находим продукты, участвующие в группах
-            products_in_group = (Product.objects.filter(product_groups=group) for group in groups_in_set_of_products)
-            # находим товары из корзины для двух групп
-            cart_items_in_group = [cart.cart_item.all().filter(offer__product__in=products) for products in products_in_group]
-            # разделяем товары из корзины по двум группам
-            first_group, second_group = cart_items_in_group[0], cart_items_in_group[1]
-            if first_group.exists() and second_group.exists():
-                # если в корзине есть товары из двух групп продуктов, входящих в продуктовый набор, значит он представлен в корзине полноценно
-                # и высчитываем сумму скидки
-                # для этого по товарам из полноценного продуктового набора получаем данные из корзины и по ним высчитываем их общую стоимость
-                data_from_cart = self.get_data_from_cart(Offer.objects.filter(cart_item__in=first_group|second_group).annotate(amount=F('cart_item__quantity'),
-                                                                                   item_pk=F('cart_item__id')))
-                summ = Decimal(sum((item['total_price'] for item in data_from_cart))).quantize(Decimal('1.00'))
-                # получаем объект скидки на наш продуктовый набор при условии его активности и действующих сроков
-                current_time = timezone.now()
-                set_discount = SetDiscount.objects.filter(set_of_products=set, is_active=True, start_date__lte=current_time, end_date__gte=current_time).first()
-                # если скидка действующая высчитываем сумму скидки
-                if set_discount:
-                    discount_size = set_discount.size
-                    if set_discount.is_percent:
-                        summ_discount = summ * discount_size / 100
-                    else:
-                        summ_discount = Decimal(discount_size)
-                    # записываем данные в лист данных в виде {продуктовый набор: сумма скидки}
-                    set_and_discount.setdefault(set, summ_discount.quantize(Decimal("1.00")))
-        # если в корзине оказались полноценные продуктовые наборы с действующими скидками
-        if set_and_discount:
-            # путем сортировки находим самый "тяжелый" по сумме скидки продуктовый набор
-            set_info = tuple(sorted(set_and_discount.items(), key=lambda item: item[1], reverse=True))[0]
-            # возвращаем инфу по продуктовому набору и стоимость всей корзины с учетом этой скидки
-            return set_info, self.get_total_price_cart(cart) - set_info[1]
-        else:
-            return None, self.get_total_price_cart(cart)
-
-    def apply_cart_discount(self, cart):
+    def calculate_cart(self, cart) -> "PricingResult":
         """
-        Применение скидки на корзину покупок к сумме корзины.
-
-        :param cart: Корзина покупок.
-        :return: Общая сумма корзины с учетом скидки на корзину, если она есть, иначе общая сумма корзины без скидки.
+        Единый расчет стоимости корзины.
+        Товары корзины вместе с продуктами, скидки на продукты и скидки на корзину загружаются один раз,
+        после чего рассчитываются позиции, стоимость с учетом скидок на продукты,
+        скидка на корзину, самая выгодная скидка на набор и итоговая стоимость.
         """
+        offers_from_cart = (Offer.objects
+                            .filter(cart_item__cart=cart)
+                            .select_related('product__icon', 'seller')
+                            .annotate(amount=F('cart_item__quantity'), item_pk=F('cart_item__id')))
+        lines = tuple(CartLine(**item) for item in self.get_data_from_cart(offers_from_cart))
+        subtotal = Decimal(sum(line.total_price for line in lines)).quantize(Decimal('1.00'))
+
         current_time = timezone.now()
-        discount_amount = 0
-        discounts = cart.discounts.filter(
+        cart_discounts = CartDiscount.objects.filter(
             cart=cart,
             is_active=True,
             start_date__lte=current_time,
             end_date__gt=current_time,
         )
-        # Если нет скидок, то возвращаем общую стоимость корзины без учета скидки
-        if not discounts:
-            return discount_amount, self.get_total_price_cart(cart)
-
-        # Вычисляем общую стоимость товаров в корзине
-        total_price = self.get_total_price_cart(cart)
-        # Получаем общее количество товаров в корзине
-        total_quantity = cart.get_total_quantity()
+        cart_discount, total_price_after_cart_discount = self.calculate_cart_discount(
+            cart_discounts, subtotal, sum(line.quantity for line in lines)
+        )
+
+        set_discount = set_discount_service.get_best_set_discount(
+            (line.offer.product_id, line.total_price) for line in lines
+        )
+        total_price_after_set_discount = subtotal - set_discount[1] if set_discount else subtotal
+
+        return PricingResult(
+            lines=lines,
+            subtotal=subtotal,
+            cart_discount=cart_discount,
+            total_price_after_cart_discount=total_price_after_cart_discount,
+            set_discount=set_discount,
+            total_price_after_set_discount=total_price_after_set_discount,
+        )
+
+    @staticmethod
+    def calculate_cart_discount(discounts, total_price, total_quantity):
+        """
+        Применение скидки на корзину покупок к сумме корзины.
+
+        :param discounts: Действующие скидки на корзину.
+        :param total_price: Стоимость корзины с учетом скидок на продукты.
+        :param total_quantity: Общее количество товаров в корзине.
+        :return: Размер скидки и общая сумма корзины с учетом скидки на корзину, если она есть.
+        """
+        discount_amount = 0
         # Применяем скидки к общей стоимости корзины
         for discount in discounts:
             # Пропускаем скидки, которые не подходят по минимальной сумме заказа или минимальному количеству товаров
@@ -204,13 +193,45 @@ class DiscountService:
         # Возвращаем общую стоимость корзины с учетом примененных скидок
         return discount_amount, total_price
 
-    def get_total_price_cart_with_all_discounts(self, cart):
-        """
-        Метод для получения итоговой стоимости корзины товаров с учетом всех возможных скидок
-        """
-        discount, total_price_after_cart_discount = self.apply_cart_discount(cart)
-        discount_info, total_price_after_set_discount = self.apply_set_discounts(cart)
-        if total_price_after_cart_discount < total_price_after_set_discount:
-            return total_price_after_cart_discount
-        else:
-            return total_price_after_set_discount
+
+@dataclass(frozen=True)
+class CartLine:
+    """
+    Позиция корзины: id товара в корзине, предложение, цена с учетом скидки на продукт,
+    количество и стоимость с учетом количества.
+    """
+
+    id: int
+    offer: Offer
+    price: Decimal
+    quantity: int
+    total_price: Decimal
+
+
+@dataclass(frozen=True)
+class PricingResult:
+    """
+    Результат расчета стоимости корзины.
+    Из скидки на корзину и скидки на набор применяется та, после которой итоговая стоимость меньше.
+    """
+
+    lines: Tuple[CartLine, ...]
+    subtotal: Decimal
+    cart_discount: Decimal
+    total_price_after_cart_discount: Decimal
+    set_discount: Optional[Tuple[SetOfProductsRule, Decimal]]
+    total_price_after_set_discount: Decimal
+
+    @property
+    def is_cart_discount_applied(self) -> bool:
+        return self.total_price_after_cart_discount < self.total_price_after_set_discount
+
+    @property
+    def has_discount(self) -> bool:
+        return bool(self.cart_discount) or self.set_discount is not None
+
+    @property
+    def total(self) -> Decimal:
+        if self.is_cart_discount_applied:
+            return self.total_price_after_cart_discount
+        return self.total_price_after_set_discount
@@ -0,0 +1,149 @@
+import hashlib
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max, Min, Q, QuerySet
+
+from .catalog_cache_service import catalog_cache_service
+from .models import CatalogIndex
+
+CATALOG_FILTER_PARAMS = ("cat", "delivery_free", "in_stock", "price", "tag", "title")
+
+
+@dataclass(frozen=True)
+class CatalogFacets:
+    """
+    Фасеты каталога для текущего набора фильтров.
+    count и счетчики категорий, тэгов, наличия и бесплатной доставки учитывают все фильтры,
+    границы цен и ценовые диапазоны - все фильтры, кроме фильтра по цене,
+    чтобы ползунок цены не сужался после его применения.
+    """
+
+    count: int
+    min_price: Optional[Decimal]
+    max_price: Optional[Decimal]
+    categories: Dict[int, int]
+    tags: Dict[int, int]
+    in_stock: int
+    free_delivery: int
+    price_buckets: Tuple[Tuple[Decimal, Decimal, int], ...]
+
+    def get_top_tags(self, count: int) -> Tuple[Tuple[int, int], ...]:
+        """ Метод получения пар (id тэга, количество товаров) для самых частых тэгов. """
+
+        return tuple(
+            sorted(self.tags.items(), key=lambda item: (-item[1], item[0]))[:count]
+        )
+
+
+class FacetService:
+    """
+    Сервис расчета фасетов каталога по индексу каталога.
+    Счетчики и ценовые диапазоны считаются агрегатами в БД,
+    результат кешируется по нормализованному набору фильтров до изменения каталога.
+    """
+
+    bucket_count = 5
+
+    @staticmethod
+    def make_filter_key(params) -> str:
+        """ Метод получения ключа набора фильтров, не зависящего от порядка и пустых параметров. """
+
+        filters = sorted(
+            (param, params.get(param)) for param in CATALOG_FILTER_PARAMS if params.get(param)
+        )
+        return hashlib.md5(urlencode(filters).encode()).hexdigest()
+
+    def get_facets(
+        self,
+        queryset: QuerySet,
+        price_range: Optional[Tuple[Decimal, Decimal]],
+        filter_key: str,
+    ) -> CatalogFacets:
+        """
+        Метод получения фасетов каталога.
+        queryset - индекс каталога со всеми фильтрами, кроме фильтра по цене.
+        """
+
+        return catalog_cache_service.get_or_set(
+            f"Catalog facets {filter_key}", lambda: self.calculate_facets(queryset, price_range)
+        )
+
+    def calculate_facets(
+        self, queryset: QuerySet, price_range: Optional[Tuple[Decimal, Decimal]]
+    ) -> CatalogFacets:
+        """ Метод расчета фасетов агрегирующими запросами к индексу каталога. """
+
+        queryset = queryset.order_by()
+        price_filter = Q(min_price__range=price_range) if price_range else Q()
+        totals = queryset.aggregate(
+            lowest_price=Min("min_price"),
+            highest_price=Max("max_price"),
+            count=Count("pk", filter=price_filter),
+            in_stock=Count("pk", filter=price_filter & Q(any_in_stock=True)),
+            free_delivery=Count("pk", filter=price_filter & Q(any_free_delivery=True)),
+        )
+
+        priced = queryset.filter(price_filter)
+        categories = dict(
+            priced.values("category_id").annotate(count=Count("pk")).values_list("category_id", "count")
+        )
+        # Тэги считаются по связям индекса: фильтр по тэгу не должен сужать счетчики других тэгов.
+        tags = dict(
+            CatalogIndex.tags.through.objects.filter(catalogindex__in=priced.values("pk"))
+            .values("tag_id")
+            .annotate(count=Count("pk"))
+            .values_list("tag_id", "count")
+        )
+
+        return CatalogFacets(
+            count=totals["count"],
+            min_price=totals["lowest_price"],
+            max_price=totals["highest_price"],
+            categories=categories,
+            tags=tags,
+            in_stock=totals["in_stock"],
+            free_delivery=totals["free_delivery"],
+            price_buckets=self.make_price_buckets(
+                queryset, totals["lowest_price"], totals["highest_price"]
+            ),
+        )
+
+    def make_price_buckets(
+        self, queryset: QuerySet, min_price: Optional[Decimal], max_price: Optional[Decimal]
+    ) -> Tuple[Tuple[Decimal, Decimal, int], ...]:
+        """ Метод разбиения цен на равные диапазоны с количеством товаров в каждом. """
+
+        if min_price is None:
+            return ()
+
+        step = (max_price - min_price) / self.bucket_count
+        if not step:
+            return ((min_price, max_price, queryset.count()),)
+
+        # Последний диапазон не ограничен сверху, чтобы в него попала максимальная цена.
+        bounds = [min_price + step * number for number in range(self.bucket_count + 1)]
+        counts = queryset.aggregate(
+            **{
+                str(number): Count(
+                    "pk",
+                    filter=Q(min_price__gte=bounds[number])
+                    & (Q(min_price__lt=bounds[number + 1]) if number < self.bucket_count - 1 else Q()),
+                )
+                for number in range(self.bucket_count)
+            }
+        )
+
+        return tuple(
+            (
+                bounds[number].quantize(Decimal("1.00")),
+                bounds[number + 1].quantize(Decimal("1.00")),
+                counts[str(number)],
+            )
+            for number in range(self.bucket_count)
+        )
+
+
+facet_service = FacetService()
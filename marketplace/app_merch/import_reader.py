@@ -0,0 +1,127 @@
+"""
+Потоковое чтение файлов импорта.
+Поддерживаются JSON массив объектов и NDJSON (один объект в строке, расширения .ndjson и .jsonl).
+Файл читается частями фиксированного размера, в памяти находится только текущая часть,
+поэтому размер файла не ограничен объемом памяти.
+Для каждой записи возвращается смещение ее начала в байтах, с которого чтение можно продолжить.
+"""
+
+import codecs
+import json
+import os
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+READ_SIZE = 64 * 1024
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+
+decoder = json.JSONDecoder()
+
+
+class ImportFormatError(ValueError):
+    """ Ошибка формата файла импорта. """
+
+
+def is_ndjson(filepath: str) -> bool:
+    return os.path.splitext(filepath)[1].lower() in NDJSON_EXTENSIONS
+
+
+def iter_records(
+    filepath: str, start: int = 0, end: Optional[int] = None
+) -> Iterator[Tuple[int, dict]]:
+    """
+    Итератор пар (смещение записи в байтах, запись) файла импорта.
+    start - смещение начала записи или 0 для начала файла,
+    end - смещение, записи начиная с которого не читаются.
+    """
+
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        reader = iter_ndjson if is_ndjson(filepath) else iter_json_array
+        for offset, record in reader(file, start):
+            if end is not None and offset >= end:
+                return
+            yield offset, record
+
+
+def iter_ndjson(file: BinaryIO, start: int = 0) -> Iterator[Tuple[int, dict]]:
+    """ Итератор записей NDJSON, пустые строки пропускаются. """
+
+    offset = start
+    for line in file:
+        if line.strip():
+            try:
+                yield offset, json.loads(line)
+            except ValueError as e:
+                raise ImportFormatError(f"Invalid JSON at byte {offset}: {e}")
+        offset += len(line)
+
+
+def iter_json_array(file: BinaryIO, start: int = 0) -> Iterator[Tuple[int, dict]]:
+    """
+    Итератор элементов JSON массива.
+    Если start равен 0, ожидается открывающая скобка массива,
+    иначе чтение начинается с элемента массива по смещению start.
+    """
+
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    # Смещение в байтах символа buffer[mark], считается по мере продвижения по буферу.
+    mark = 0
+    mark_offset = start
+    eof = False
+
+    def get_offset(index: int) -> int:
+        nonlocal mark, mark_offset
+        mark_offset += len(buffer[mark:index].encode("utf-8"))
+        mark = index
+        return mark_offset
+
+    def read_more() -> bool:
+        """ Чтение следующей части файла, прочитанная часть буфера отбрасывается. """
+        nonlocal buffer, position, mark, eof
+        if eof:
+            return False
+        data = file.read(READ_SIZE)
+        eof = not data
+        get_offset(position)
+        buffer = buffer[position:] + text_decoder.decode(data, final=eof)
+        position = mark = 0
+        return bool(data)
+
+    def skip(chars: str) -> bool:
+        """ Пропуск символов, возвращает False, если файл закончился. """
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            if position < len(buffer):
+                return True
+            if not read_more():
+                return False
+
+    if start == 0:
+        if not skip(" \t\r\n\ufeff"):
+            return
+        if buffer[position] != "[":
+            raise ImportFormatError("JSON array expected")
+        position += 1
+
+    while True:
+        if not skip(" \t\r\n,"):
+            raise ImportFormatError("Unexpected end of file")
+        if buffer[position] == "]":
+            return
+        try:
+            record, record_end = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            # Запись могла быть прочитана не полностью, но одна запись не может занимать весь файл.
+            if len(buffer) - position < MAX_RECORD_SIZE and read_more():
+                continue
+            raise ImportFormatError(f"Invalid JSON at byte {get_offset(position)}: {e}")
+        if record_end == len(buffer) and read_more():
+            # Значение на границе части файла могло быть прочитано не полностью.
+            continue
+        yield get_offset(position), record
+        position = record_end
@@ -1,14 +1,29 @@
-import json
+import csv
+import io
 import logging
 import os
 import shutil
-from typing import Union
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from typing import List, Optional, Set, Tuple
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
 from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
 
+from app_settings import cache_tags
 from marketplace.settings import BASE_DIR
-from .models import Product
+from .catalog_index_service import catalog_index_service
+from .category_tree import category_tree_service
+from .import_reader import iter_records
+from .models import ImportChunk, ImportJob, ImportRowError, Product
+from .price_summary_service import price_summary_service
+from .search_service import search_service
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -18,61 +33,630 @@ logging.basicConfig(
 )
 
 
+@dataclass
+class ImportResult:
+    """ Итоги импорта файла. """
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+    errors: int = 0
+    # Файл прочитан не до конца из-за ошибки формата или чтения.
+    failed: bool = False
+
+    def __str__(self):
+        return (
+            f"created: {self.created}, updated: {self.updated}, unchanged: {self.unchanged}, "
+            f"deactivated: {self.deactivated}, errors: {self.errors}"
+        )
+
+
 class ImportProductsService:
-    """ Сервис позволяющий работать с импортом товаров. """
+    """
+    Сервис позволяющий работать с импортом товаров.
+    Файл читается потоково, строки проверяются и сохраняются пачками по batch_size,
+    каждая пачка - в отдельной транзакции.
+    Режимы импорта:
+    create - все строки добавляются как новые продукты;
+    upsert - строки сопоставляются с продуктами по артикулу (sku), существующие продукты
+    обновляются через bulk_update только при изменении полей, остальные добавляются.
+    При deactivate_missing в режиме upsert продукты с артикулом, которых нет в файле,
+    делаются неактивными, а продукты из файла - активными.
+    Задания импорта (ImportJob) делят файлы на части, которые импортируются параллельно.
+    Для части после каждой пачки в той же транзакции сохраняются ошибки строк
+    и контрольная точка, с которой прерванное задание продолжается.
+    """
+
+    MODE_CREATE = "create"
+    MODE_UPSERT = "upsert"
+    MODES = (MODE_CREATE, MODE_UPSERT)
+
+    batch_size = 1000
+    failed_message = "Импорт прерван, задание можно продолжить."
+    required_fields = ("title", "description", "category_id", "characters")
+    update_fields = ("title", "description", "category_id", "characters")
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        mode: str = MODE_CREATE,
+        deactivate_missing: bool = False,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown import mode: {mode}")
+        if batch_size:
+            self.batch_size = batch_size
+        self.mode = mode
+        self.deactivate_missing = deactivate_missing and mode == self.MODE_UPSERT
+        if self.deactivate_missing:
+            # Активность продуктов определяется файлом: отключенный ранее продукт из файла включается.
+            self.update_fields = self.update_fields + ("is_active",)
+        # Ошибки строк (номер, смещение, текст), еще не сохраненные вместе с контрольной точкой.
+        self.row_errors: List[Tuple[int, Optional[int], str]] = []
+
+    @classmethod
+    def for_job(cls, job: ImportJob) -> "ImportProductsService":
+        return cls(job.batch_size, mode=job.mode, deactivate_missing=job.deactivate_missing)
 
     @staticmethod
-    def read_data_from_file(filepath: str) -> Union[dict, bool]:
-        """ Метод чтения данных из файла. Ожидается JSON. """
+    def get_category_ids() -> Set[int]:
+        """ Множество id существующих категорий из дерева категорий процесса. """
+
+        return set(category_tree_service.get_tree().ids)
+
+    def make_product(self, row: dict, category_ids: Set[int]) -> Product:
+        """ Метод проверки строки файла и создания по ней несохраненного продукта. """
+
+        if not isinstance(row, dict):
+            raise ValueError("Product must be a JSON object")
+        missing = [field for field in self.required_fields if field not in row]
+        if self.mode == self.MODE_UPSERT and not row.get("sku"):
+            missing.append("sku")
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        if row["category_id"] not in category_ids:
+            raise ValueError(f"Category {row['category_id']} does not exist")
 
+        product = Product(
+            title=row["title"],
+            description=row["description"],
+            category_id=row["category_id"],
+            characters=row["characters"],
+            sku=str(row["sku"]) if row.get("sku") else None,
+            is_active=self.deactivate_missing,
+        )
         try:
-            with open(filepath, 'r') as f:
-                json_data = json.loads(f.read())
-            return json_data
-        except Exception as e:
-            logger.error(f'Could not read data from file: {filepath}. ERROR: {e}')
-            return False
+            product.clean_fields(exclude=["category", "icon"])
+        except ValidationError as e:
+            raise ValueError(e.message_dict)
+        return product
 
-    def parse_products(self, filepath: str) -> bool:
-        """ Метод парсинга и добавления новых товаров. """
+    def save_batch(
+        self, batch: List[Tuple[int, int, Product]], filepath: str, result: ImportResult
+    ) -> None:
+        """
+        Метод сохранения пачки продуктов в одной транзакции.
+        Пачка - список (номер записи, смещение записи, продукт).
+        Существующие продукты с теми же артикулами загружаются одним запросом.
+        В режиме upsert строки без артикула не сохраняются: их нельзя сопоставить
+        с продуктом при повторном импорте, и каждый запуск добавлял бы дубликаты.
+        """
 
-        products_data = self.read_data_from_file(filepath=filepath)
-        failed = False
+        rows = {}
+        for index, offset, product in batch:
+            if not product.sku and self.mode == self.MODE_UPSERT:
+                self.log_row_error(filepath, index, "Missing fields: sku", result, offset)
+                continue
+            if product.sku and product.sku in rows and self.mode == self.MODE_CREATE:
+                self.log_row_error(filepath, index, f"Duplicate sku {product.sku}", result, offset)
+                continue
+            rows[product.sku or f"row {index}"] = (index, offset, product)
 
-        if products_data is False:
-            return False
+        skus = [product.sku for index, offset, product in rows.values() if product.sku]
+        existing = {
+            product.sku: product
+            for product in Product.objects.filter(sku__in=skus).only("pk", "sku", *self.update_fields)
+        } if skus else {}
 
-        for index, product in enumerate(products_data):
-            try:
-                Product.objects.create(
-                    title=product['title'],
-                    description=product['description'],
-                    category_id=product['category_id'],
-                    characters=product['characters']
+        new_products, changed_products, changed_fields = [], [], set()
+        for index, offset, product in rows.values():
+            current = existing.get(product.sku) if product.sku else None
+            if current is None:
+                new_products.append(product)
+            elif self.mode == self.MODE_CREATE:
+                self.log_row_error(
+                    filepath, index, f"Product with sku {product.sku} already exists", result, offset
                 )
+            else:
+                fields = self.get_changed_fields(current, product)
+                if fields:
+                    for field in fields:
+                        setattr(current, field, getattr(product, field))
+                    changed_products.append(current)
+                    changed_fields.update(fields)
+                else:
+                    result.unchanged += 1
 
-                logger.info(
-                    msg=f"INDEX: {index+1} from PATH: {filepath} was SUCCESSFULLY imported."
+        with transaction.atomic():
+            Product.objects.bulk_create(new_products, batch_size=self.batch_size)
+            created_ids = self.get_created_ids(new_products)
+            if changed_products:
+                Product.objects.bulk_update(
+                    changed_products, sorted(changed_fields), batch_size=self.batch_size
                 )
-            except Exception as e:
-                logger.error(
-                    msg=f"INDEX: {index+1} from PATH: {filepath} was NOT imported. Error: {e}"
+        result.created += len(new_products)
+        result.updated += len(changed_products)
+
+        product_ids = created_ids + [product.pk for product in changed_products]
+        if product_ids:
+            # Внутри транзакции задания индексы и кеш обновляются после ее фиксации.
+            transaction.on_commit(partial(self.refresh_products, product_ids))
+
+    @staticmethod
+    def get_created_ids(new_products: List[Product]) -> List[int]:
+        """
+        Метод получения id продуктов, добавленных bulk_create.
+        SQLite не возвращает id добавленных строк, поэтому продукты с артикулом
+        находятся по артикулам, а продукты без артикула - как последние добавленные:
+        до конца транзакции SQLite другие процессы не могут добавлять строки.
+        """
+
+        created_ids = [product.pk for product in new_products if product.pk]
+        if len(created_ids) == len(new_products):
+            return created_ids
+
+        skus = [product.sku for product in new_products if product.sku]
+        created_ids = list(Product.objects.filter(sku__in=skus).values_list("pk", flat=True))
+        without_sku = len(new_products) - len(skus)
+        if without_sku:
+            created_ids += list(
+                Product.objects.filter(sku__isnull=True)
+                .order_by("-pk")
+                .values_list("pk", flat=True)[:without_sku]
+            )
+        return created_ids
+
+    def get_changed_fields(self, current: Product, product: Product) -> List[str]:
+        return [
+            field
+            for field in self.update_fields
+            if getattr(current, field) != getattr(product, field)
+        ]
+
+    @staticmethod
+    def refresh_products(product_ids: List[int]) -> None:
+        """
+        Обновление сводок цен, индексов и кеша для добавленных и измененных продуктов.
+        bulk_create и bulk_update не отправляют сигналы post_save, поэтому индексы обновляются явно.
+        """
+
+        price_summary_service.rebuild(product_ids)
+        catalog_index_service.rebuild(product_ids)
+        search_service.index_products(product_ids)
+        cache_tags.invalidate_tags(*(f"product:{pk}" for pk in product_ids))
+
+    def deactivate_products(self, seen_skus: Set[str], result: ImportResult) -> None:
+        """ Метод отключения активных продуктов с артикулом, отсутствующих в файле. """
+
+        missing_ids = [
+            pk
+            for pk, sku in Product.objects.filter(sku__isnull=False, is_active=True)
+            .values_list("pk", "sku")
+            .iterator(chunk_size=self.batch_size)
+            if sku not in seen_skus
+        ]
+        for start in range(0, len(missing_ids), self.batch_size):
+            product_ids = missing_ids[start:start + self.batch_size]
+            with transaction.atomic():
+                Product.objects.filter(pk__in=product_ids).update(is_active=False)
+            self.refresh_products(product_ids)
+        result.deactivated += len(missing_ids)
+
+    def log_row_error(
+        self, filepath: str, index: int, error, result: ImportResult, offset: Optional[int] = None
+    ) -> None:
+        result.errors += 1
+        self.row_errors.append((index, offset, str(error)))
+        logger.error(msg=f"INDEX: {index} from PATH: {filepath} was NOT imported. Error: {error}")
+
+    def import_records(
+        self,
+        filepath: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        first_index: int = 1,
+        seen_skus: Optional[Set[str]] = None,
+        chunk: Optional[ImportChunk] = None,
+    ) -> ImportResult:
+        """
+        Метод потокового импорта записей файла между смещениями start и end.
+        first_index - номер первой записи в файле для сообщений лога,
+        в seen_skus собираются артикулы прочитанных записей.
+        Если передана часть задания, после каждой пачки сохраняется ее контрольная точка,
+        а итоги продолжают итоги части до контрольной точки.
+        """
+
+        category_ids = self.get_category_ids()
+        result = self.get_chunk_result(chunk) if chunk is not None else ImportResult()
+        batch = []
+        self.row_errors = []
+        checkpoint_index = next_index = first_index
+
+        try:
+            records = iter_records(filepath, start, end)
+            for index, (offset, row) in enumerate(records, first_index):
+                # Пачка сохраняется перед следующей записью, смещение которой становится контрольной точкой.
+                if index - checkpoint_index >= self.batch_size:
+                    self.commit_batch(batch, filepath, result, chunk, offset, index)
+                    batch = []
+                    checkpoint_index = index
+                if seen_skus is not None and isinstance(row, dict) and row.get("sku"):
+                    seen_skus.add(str(row["sku"]))
+                try:
+                    batch.append((index, offset, self.make_product(row, category_ids)))
+                except ValueError as e:
+                    self.log_row_error(filepath, index, e, result, offset)
+                next_index = index + 1
+            self.commit_batch(batch, filepath, result, chunk, None, next_index)
+        except Exception as e:
+            logger.error(f'Could not import data from file: {filepath}. ERROR: {e}')
+            result.errors += 1
+            result.failed = True
+            if chunk is not None:
+                chunk.status = ImportJob.STATUS_FAILED
+                chunk.message = str(e)
+                chunk.save(update_fields=["status", "message", "updated_at"])
+        finally:
+            if result.created or result.updated:
+                cache_tags.invalidate_tags("products")
+
+        return result
+
+    def commit_batch(
+        self,
+        batch: List[Tuple[int, int, Product]],
+        filepath: str,
+        result: ImportResult,
+        chunk: Optional[ImportChunk] = None,
+        offset: Optional[int] = None,
+        next_index: int = 1,
+    ) -> None:
+        """
+        Метод сохранения пачки продуктов вместе с контрольной точкой части задания.
+        offset и next_index - смещение и номер следующей несохраненной записи,
+        offset None означает, что часть прочитана полностью.
+        """
+
+        with transaction.atomic():
+            if batch:
+                self.save_batch(batch, filepath, result)
+            if chunk is not None:
+                self.save_checkpoint(chunk, result, offset, next_index)
+        self.row_errors = []
+
+    def save_checkpoint(
+        self, chunk: ImportChunk, result: ImportResult, offset: Optional[int], next_index: int
+    ) -> None:
+        """ Метод сохранения контрольной точки, итогов и ошибок строк части задания. """
+
+        if offset is not None:
+            chunk.offset = offset
+        chunk.next_index = next_index
+        chunk.created = result.created
+        chunk.updated = result.updated
+        chunk.unchanged = result.unchanged
+        chunk.errors = result.errors
+        chunk.status = ImportJob.STATUS_COMPLETED if offset is None else ImportJob.STATUS_RUNNING
+        chunk.save(
+            update_fields=[
+                "offset", "next_index", "created", "updated", "unchanged", "errors", "status",
+                "updated_at",
+            ]
+        )
+        ImportRowError.objects.bulk_create(
+            [
+                ImportRowError(
+                    job_id=chunk.job_id,
+                    filepath=chunk.filepath,
+                    index=index,
+                    offset=offset,
+                    message=message,
                 )
-                failed = True
+                for index, offset, message in self.row_errors
+            ],
+            batch_size=self.batch_size,
+        )
 
-        return False if failed else True
+    @staticmethod
+    def get_chunk_result(chunk: ImportChunk) -> ImportResult:
+        return ImportResult(
+            created=chunk.created,
+            updated=chunk.updated,
+            unchanged=chunk.unchanged,
+            errors=chunk.errors,
+        )
+
+    def import_file(self, filepath: str) -> ImportResult:
+        """ Метод потокового импорта файла, возвращает итоги импорта. """
+
+        seen_skus = set() if self.deactivate_missing else None
+        result = self.import_records(filepath, seen_skus=seen_skus)
+        # Если файл прочитан не до конца, отключать отсутствующие в нем продукты нельзя.
+        if self.deactivate_missing and not result.failed:
+            self.deactivate_products(seen_skus, result)
+
+        logger.info(msg=f"PATH: {filepath}: {result}")
+        return result
+
+    @staticmethod
+    def make_chunks(
+        filepath: str, chunk_size: Optional[int] = None, chunks_count: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Метод разбиения файла на части для параллельного импорта.
+        Часть - это словарь со смещениями start и end в байтах, номером первой записи first_index
+        и количеством записей count.
+        Размер части задается количеством записей chunk_size или количеством частей chunks_count.
+        Файл, который не удалось разобрать, возвращается одной частью,
+        чтобы ошибка была записана в лог при ее импорте.
+        """
+
+        try:
+            offsets = array("q", (offset for offset, row in iter_records(filepath)))
+        except Exception:
+            offsets = array("q")
+        if chunks_count and not chunk_size:
+            chunk_size = -(-len(offsets) // chunks_count)
+        chunk_size = max(chunk_size or len(offsets), 1)
+
+        chunks = []
+        for first in range(0, len(offsets), chunk_size):
+            last = first + chunk_size
+            chunks.append(
+                {
+                    "start": offsets[first] if first else 0,
+                    "end": offsets[last] if last < len(offsets) else None,
+                    "first_index": first + 1,
+                    "count": min(chunk_size, len(offsets) - first),
+                }
+            )
+        return chunks or [{"start": 0, "end": None, "first_index": 1, "count": 0}]
+
+    @staticmethod
+    def collect_skus(filepaths: List[str]) -> Set[str]:
+        """ Метод получения артикулов всех записей файлов. """
+
+        return {
+            str(row["sku"])
+            for filepath in filepaths
+            for offset, row in iter_records(filepath)
+            if isinstance(row, dict) and row.get("sku")
+        }
+
+    def create_job(
+        self,
+        filepaths: List[str],
+        chunk_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        email: Optional[str] = None,
+    ) -> ImportJob:
+        """ Метод создания задания импорта файлов с настройками сервиса. """
+
+        return ImportJob.objects.create(
+            files=list(filepaths),
+            mode=self.mode,
+            batch_size=self.batch_size,
+            chunk_size=chunk_size,
+            workers=workers,
+            deactivate_missing=self.deactivate_missing,
+            email=email or "",
+        )
+
+    def prepare_job(self, job: ImportJob) -> List[int]:
+        """
+        Метод подготовки задания к запуску или продолжению.
+        При первом запуске файлы делятся на части, возвращаются id незавершенных частей.
+        """
+
+        with transaction.atomic():
+            if not job.chunks.exists():
+                ImportChunk.objects.bulk_create(
+                    ImportChunk(
+                        job=job,
+                        filepath=filepath,
+                        start=chunk["start"],
+                        end=chunk["end"],
+                        first_index=chunk["first_index"],
+                        total=chunk["count"],
+                        offset=chunk["start"],
+                        next_index=chunk["first_index"],
+                    )
+                    for filepath in job.files
+                    for chunk in self.make_chunks(filepath, job.chunk_size, job.workers)
+                )
+            job.status = ImportJob.STATUS_RUNNING
+            job.finished_at = None
+            job.message = ""
+            job.save(update_fields=["status", "finished_at", "message", "updated_at"])
+            return list(
+                job.chunks.exclude(status=ImportJob.STATUS_COMPLETED).values_list("pk", flat=True)
+            )
+
+    def import_chunk(self, chunk: ImportChunk) -> ImportResult:
+        """
+        Метод импорта части файла задания с ее контрольной точки.
+        Полностью импортированная часть повторно не импортируется.
+        """
+
+        if chunk.status != ImportJob.STATUS_COMPLETED:
+            chunk.status = ImportJob.STATUS_RUNNING
+            chunk.message = ""
+            chunk.save(update_fields=["status", "message", "updated_at"])
+            self.import_records(
+                chunk.filepath, chunk.offset, chunk.end, chunk.next_index, chunk=chunk
+            )
+            chunk.refresh_from_db()
+
+        result = self.get_chunk_result(chunk)
+        result.failed = chunk.status != ImportJob.STATUS_COMPLETED
+        return result
+
+    def finish_job(self, job: ImportJob) -> dict:
+        """
+        Метод завершения задания после импорта всех его частей.
+        Если все части импортированы полностью, отсутствующие в файлах продукты отключаются,
+        а файлы переносятся в директорию с готовыми импортами.
+        Иначе файлы остаются на месте, и задание можно продолжить с контрольных точек.
+        Возвращает состояние задания.
+        """
+
+        failed = job.chunks.exclude(status=ImportJob.STATUS_COMPLETED).exists()
+        if not failed:
+            if self.deactivate_missing:
+                result = ImportResult()
+                self.deactivate_products(self.collect_skus(job.files), result)
+                job.deactivated = result.deactivated
+            for filepath in job.files:
+                self.move_file_to_completed_directory(filepath=filepath)
+
+        job.status = ImportJob.STATUS_FAILED if failed else ImportJob.STATUS_COMPLETED
+        job.message = self.failed_message if failed else ""
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "message", "finished_at", "deactivated", "updated_at"])
+
+        status = self.get_job_status(job)
+        logger.info(
+            msg=f"IMPORT JOB {job.pk} {job.status.upper()}: processed: {status['processed']}, "
+            f"created: {status['created']}, updated: {status['updated']}, "
+            f"unchanged: {status['unchanged']}, deactivated: {status['deactivated']}, "
+            f"errors: {status['errors']}"
+        )
+
+        if job.email:
+            job.email_sent = self.send_report(job, status)
+            job.save(update_fields=["email_sent"])
+            status["email_sent"] = job.email_sent
+        return status
+
+    @classmethod
+    def fail_job(
+        cls, job: ImportJob, message: Optional[str] = None, stale_before: Optional[datetime] = None
+    ) -> bool:
+        """
+        Метод отметки незавершенного задания прерванным, чтобы его можно было продолжить.
+        Если передано stale_before, задание отмечается, только если ни оно, ни его части
+        не обновлялись с этого момента. Возвращает признак отметки задания.
+        """
+
+        jobs = ImportJob.objects.filter(
+            pk=job.pk, status__in=(ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING)
+        )
+        if stale_before is not None:
+            jobs = jobs.filter(updated_at__lt=stale_before).exclude(
+                chunks__updated_at__gte=stale_before
+            )
+        now = timezone.now()
+        failed = bool(
+            jobs.update(
+                status=ImportJob.STATUS_FAILED,
+                message=message or cls.failed_message,
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+        if failed:
+            job.refresh_from_db()
+        return failed
+
+    @classmethod
+    def fail_stale_job(cls, job: ImportJob) -> bool:
+        """
+        Метод отметки прерванным задания, которое не обновлялось дольше IMPORT_JOB_STALE_TIMEOUT секунд.
+        Части обновляются после каждой пачки, поэтому такое задание потеряло воркер или задачу
+        и без отметки осталось бы выполняющимся навсегда.
+        """
+
+        if job.status not in (ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING):
+            return False
+        timeout = getattr(settings, "IMPORT_JOB_STALE_TIMEOUT", 15 * 60)
+        return cls.fail_job(
+            job,
+            "Задание не обновлялось, импорт прерван. Задание можно продолжить.",
+            stale_before=timezone.now() - timedelta(seconds=timeout),
+        )
+
+    @classmethod
+    def get_job_status(cls, job: ImportJob, errors_count: int = 20) -> dict:
+        """
+        Метод получения состояния задания: общие итоги, итоги по файлам
+        и последние errors_count ошибок строк.
+        Зависшее задание при этом отмечается прерванным.
+        """
+
+        cls.fail_stale_job(job)
+
+        counters = ("total", "processed", "created", "updated", "unchanged", "errors")
+        files = {}
+        for chunk in job.chunks.all():
+            file = files.setdefault(
+                chunk.filepath,
+                dict({counter: 0 for counter in counters}, file=os.path.basename(chunk.filepath)),
+            )
+            file["total"] += chunk.total
+            file["processed"] += chunk.next_index - chunk.first_index
+            file["created"] += chunk.created
+            file["updated"] += chunk.updated
+            file["unchanged"] += chunk.unchanged
+            file["errors"] += chunk.errors
+            file["failed"] = file.get("failed", False) or chunk.status == ImportJob.STATUS_FAILED
+
+        status = {counter: sum(file[counter] for file in files.values()) for counter in counters}
+        status.update(
+            id=job.pk,
+            status=job.status,
+            status_display=job.get_status_display(),
+            finished=job.status in (ImportJob.STATUS_COMPLETED, ImportJob.STATUS_FAILED),
+            succeeded=status["created"] + status["updated"] + status["unchanged"],
+            deactivated=job.deactivated,
+            progress=int(status["processed"] * 100 / status["total"]) if status["total"] else 0,
+            message=job.message,
+            email_sent=job.email_sent,
+            files=list(files.values()),
+            row_errors=[
+                {"file": os.path.basename(filepath), "index": index, "message": message}
+                for filepath, index, message in job.row_errors.order_by("-pk").values_list(
+                    "filepath", "index", "message"
+                )[:errors_count]
+            ],
+        )
+        return status
+
+    def parse_products(self, filepath: str) -> bool:
+        """ Метод парсинга и добавления или обновления товаров. """
+
+        return not self.import_file(filepath).errors
 
     def import_products(self, filepath: str) -> bool:
         """ Метод запуска парсинга и переноса файла с данными. """
 
-        if self.parse_products(filepath=filepath):
-            result = self.move_file_to_completed_directory(filepath=filepath)
-            return True if result else False
-        else:
-            if filepath.endswith('.json'):
-                logger.info(f'REMOVING: {filepath}. INCORRECT DATA')
-                os.remove(filepath)
+        result = self.import_file(filepath)
+        if result.failed:
+            # Файл остается на месте, чтобы его можно было исправить и импортировать повторно.
+            logger.error(f'KEEPING: {filepath}. File was not imported completely')
             return False
+        self.move_file_to_completed_directory(filepath=filepath)
+        return not result.errors
+
+    @staticmethod
+    def save_uploaded_files(files) -> List[str]:
+        """
+        Метод сохранения загруженных файлов в директорию ожидающих импорта.
+        Файл с занятым именем сохраняется под новым именем, возвращаются пути к файлам.
+        """
+
+        storage = FileSystemStorage(location=os.path.join(BASE_DIR, 'imports', 'waiting'))
+        return [storage.path(storage.save(os.path.basename(file.name), file)) for file in files]
 
     @staticmethod
     def move_file_to_completed_directory(filepath: str) -> bool:
@@ -88,23 +672,36 @@ class ImportProductsService:
             return False
 
     @staticmethod
-    def send_log(dst_email: str) -> bool:
-        """ Метод отправки файла с логом на E-mail. """
+    def send_report(job: ImportJob, status: Optional[dict] = None) -> bool:
+        """ Метод отправки итогов задания импорта с ошибками строк в CSV на E-mail. """
 
         try:
-            with open(os.path.join(BASE_DIR, 'imports', 'results.log'), 'r') as log_f:
-                content = log_f.read()
-
+            status = status or ImportProductsService.get_job_status(job)
+            body = "\n".join(
+                [f"Задание импорта №{job.pk}: {status['status_display']}."]
+                + [
+                    f"{file['file']}: обработано {file['processed']} из {file['total']}, "
+                    f"добавлено {file['created']}, обновлено {file['updated']}, "
+                    f"без изменений {file['unchanged']}, ошибок {file['errors']}"
+                    for file in status["files"]
+                ]
+                + [f"Отключено продуктов: {status['deactivated']}"]
+            )
             email = EmailMessage(
                 subject="Результат импортирования товаров.",
-                body="Ваши товары были импортированы! Пожалуйста, проверьте лог файл.",
+                body=body,
                 from_email=settings.EMAIL_HOST_USER,
-                to=[dst_email]
-            )
-            email.attach(
-                filename="results.log",
-                content=content,
+                to=[job.email],
             )
+            if status["errors"]:
+                errors = io.StringIO()
+                writer = csv.writer(errors)
+                writer.writerow(["file", "index", "offset", "error"])
+                for filepath, index, offset, message in job.row_errors.values_list(
+                    "filepath", "index", "offset", "message"
+                ).iterator():
+                    writer.writerow([os.path.basename(filepath), index, offset, message])
+                email.attach(f"import-{job.pk}-errors.csv", errors.getvalue(), "text/csv")
             email.send()
             return True
 
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app_merch.catalog_index_service import catalog_index_service
+
+
+class Command(BaseCommand):
+    """
+    Кастомная management команда для перестройки индекса каталога.
+    """
+
+    help = "Rebuild the catalog index."
+
+    def add_arguments(self, parser):
+        """
+        Аргумент 'products' для команды:
+        Является опциональным, пример:
+        python manage.py rebuild_catalog_index 1 2 3
+        """
+
+        parser.add_argument(
+            "products", nargs="*", type=int, default=[], help="List of product ids to rebuild"
+        )
+
+    def handle(self, *args, **options):
+        count = catalog_index_service.rebuild(options["products"] or None)
+        self.stdout.write(self.style.SUCCESS(f"SUCCESSFULLY rebuilt: {count} products"))
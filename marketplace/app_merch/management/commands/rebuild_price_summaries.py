@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app_merch.price_summary_service import price_summary_service
+
+
+class Command(BaseCommand):
+    """
+    Кастомная management команда для пересчета сводной информации о ценах продуктов.
+    """
+
+    help = "Rebuild product price summaries."
+
+    def add_arguments(self, parser):
+        """
+        Аргумент 'products' для команды:
+        Является опциональным, пример:
+        python manage.py rebuild_price_summaries 1 2 3
+        """
+
+        parser.add_argument(
+            "products", nargs="*", type=int, default=[], help="List of product ids to rebuild"
+        )
+
+    def handle(self, *args, **options):
+        count = price_summary_service.rebuild(options["products"] or None)
+        self.stdout.write(self.style.SUCCESS(f"SUCCESSFULLY rebuilt: {count} products"))
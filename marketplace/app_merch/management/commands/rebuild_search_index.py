@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app_merch.search_service import search_service
+
+
+class Command(BaseCommand):
+    """
+    Кастомная management команда для перестройки поискового индекса продуктов.
+    """
+
+    help = "Rebuild the product search index."
+
+    def add_arguments(self, parser):
+        """
+        Аргумент 'products' для команды:
+        Является опциональным, пример:
+        python manage.py rebuild_search_index 1 2 3
+        """
+
+        parser.add_argument(
+            "products", nargs="*", type=int, default=[], help="List of product ids to rebuild"
+        )
+
+    def handle(self, *args, **options):
+        count = search_service.index_products(options["products"] or None)
+        self.stdout.write(self.style.SUCCESS(f"SUCCESSFULLY rebuilt: {count} products"))
@@ -1,9 +1,12 @@
 import os
+import time
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from app_merch.tasks import make_an_products_importation
+from app_merch.import_service import ImportProductsService
+from app_merch.models import ImportJob
+from app_merch.tasks import resume_products_import, start_products_import
 
 
 class Command(BaseCommand):
@@ -12,28 +15,94 @@ class Command(BaseCommand):
     """
 
     help = "Import products from JSON files."
+    progress_interval = 1
 
     def add_arguments(self, parser):
         """
         Аргумент 'files' для команды:
         Является опциональным, пример:
         python manage.py start_import apple.json samsung.json
+        Файлы делятся на части, которые импортируются параллельно задачами Celery.
+        Опция --chunk-size задает количество товаров в одной части,
+        --workers - количество частей файла, если --chunk-size не задан.
+        Опция --batch-size задает количество товаров, сохраняемых в одной транзакции.
+        Опция --mode upsert обновляет продукты с теми же артикулами (sku) вместо добавления,
+        --deactivate-missing отключает продукты, артикулов которых нет в файле.
+        Опция --resume продолжает прерванное задание импорта с последних сохраненных пачек.
         """
 
         parser.add_argument(
             "files", nargs="*", type=str, default=[], help="List of files to import from"
         )
+        parser.add_argument(
+            "--batch-size", type=int, default=None, help="Number of products saved per transaction"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=None, help="Number of products imported by one task"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of tasks each file is split into when --chunk-size is not set",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=ImportProductsService.MODES,
+            default=ImportProductsService.MODE_CREATE,
+            help="create - add all rows as new products, upsert - match rows on sku",
+        )
+        parser.add_argument(
+            "--deactivate-missing",
+            action="store_true",
+            help="In upsert mode deactivate products whose sku is missing from the file",
+        )
+        parser.add_argument(
+            "--resume", type=int, default=None, metavar="JOB_ID", help="Resume an interrupted import job"
+        )
 
     def handle(self, *args, **options):
         file_list = options["files"] if options["files"] else os.listdir(
             os.path.join(settings.BASE_DIR, 'imports', 'waiting')
         )
+        filepaths = [
+            os.path.join(settings.BASE_DIR, 'imports', 'waiting', file) for file in file_list
+        ]
+
+        if options["resume"]:
+            job = ImportJob.objects.filter(pk=options["resume"]).first()
+            if job is None or job.status != ImportJob.STATUS_FAILED:
+                raise CommandError(f"Import job {options['resume']} does not exist or was not interrupted")
+            resume_products_import(job)
+        else:
+            job = start_products_import(
+                filepaths,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+                mode=options["mode"],
+                deactivate_missing=options["deactivate_missing"],
+            )
+        self.stdout.write(f"Import job: {job.pk}")
+
+        status = ImportProductsService.get_job_status(job)
+        while not status["finished"]:
+            time.sleep(self.progress_interval)
+            job.refresh_from_db()
+            status = ImportProductsService.get_job_status(job)
+            self.stdout.write(f"Imported rows: {status['processed']}/{status['total']}")
 
-        for file in file_list:
-            filepath = os.path.join(settings.BASE_DIR, 'imports', 'waiting', file)
-            res = make_an_products_importation.delay(filepath=filepath).get()
+        for file_status in status["files"]:
+            counts = ", ".join(
+                f"{key}: {file_status[key]}"
+                for key in ("processed", "created", "updated", "unchanged", "errors")
+            )
             self.stdout.write(
-                self.style.SUCCESS(f"SUCCESSFULLY imported: {file}")
-            ) if res else self.stderr.write(
-                self.style.ERROR(f"FAILED to import: {file}")
+                self.style.SUCCESS(f"SUCCESSFULLY imported: {file_status['file']} ({counts})")
+            ) if not file_status["errors"] and not file_status["failed"] else self.stderr.write(
+                self.style.ERROR(f"FAILED to import: {file_status['file']} ({counts})")
+            )
+        if status["status"] == ImportJob.STATUS_FAILED:
+            self.stderr.write(
+                self.style.ERROR(f"Import was interrupted, resume it with --resume {job.pk}")
             )
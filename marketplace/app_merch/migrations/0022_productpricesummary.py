@@ -0,0 +1,105 @@
+# Generated by Django 3.2.18 on 2026-10-18 07:45
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def round_price(price):
+    return Decimal(price).quantize(Decimal("1.00")) if price is not None else None
+
+
+def average(prices):
+    return sum(prices) / len(prices) if prices else None
+
+
+def fill_price_summaries(apps, schema_editor):
+    """
+    Заполнение сводок цен существующих продуктов.
+    Расчет повторяет PriceSummaryService на исторических моделях миграции.
+    """
+
+    Product = apps.get_model("app_merch", "Product")
+    Offer = apps.get_model("app_merch", "Offer")
+    Discount = apps.get_model("app_merch", "Discount")
+    Review = apps.get_model("app_merch", "Review")
+    ProductPriceSummary = apps.get_model("app_merch", "ProductPriceSummary")
+
+    product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        prices = defaultdict(list)
+        for product_id, price in Offer.objects.filter(product_id__in=batch).values_list(
+            "product_id", "price"
+        ):
+            prices[product_id].append(price)
+        discounts = {
+            discount.product_id: discount
+            for discount in Discount.objects.filter(product_id__in=batch, is_active=True)
+        }
+        review_counts = dict(
+            Review.objects.filter(offer__product_id__in=batch, is_active=True)
+            .values("offer__product_id")
+            .annotate(count=Count("pk"))
+            .values_list("offer__product_id", "count")
+        )
+
+        summaries = []
+        for product_id in batch:
+            product_prices = prices[product_id]
+            discount = discounts.get(product_id)
+            discount_prices = [
+                (
+                    price * (1 - Decimal(discount.size) / 100)
+                    if discount.is_percent
+                    else price - discount.size
+                ) if discount else price
+                for price in product_prices
+            ]
+            summaries.append(
+                ProductPriceSummary(
+                    product_id=product_id,
+                    min_price=min(product_prices) if product_prices else None,
+                    max_price=max(product_prices) if product_prices else None,
+                    avg_price=round_price(average(product_prices)),
+                    avg_discount_price=round_price(average(discount_prices)),
+                    has_active_discount=bool(discount and discount.size > 0),
+                    offer_count=len(product_prices),
+                    review_count=review_counts.get(product_id, 0),
+                )
+            )
+        ProductPriceSummary.objects.bulk_create(summaries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0021_alter_image_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_summary', serialize=False, to='app_merch.product', verbose_name='продукт')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='минимальная цена')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='максимальная цена')),
+                ('avg_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='средняя цена')),
+                ('avg_discount_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='средняя цена с учетом скидки')),
+                ('has_active_discount', models.BooleanField(default=False, verbose_name='есть активная скидка')),
+                ('offer_count', models.PositiveIntegerField(default=0, verbose_name='количество предложений')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='количество отзывов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Сводка цен продукта',
+                'verbose_name_plural': 'Сводки цен продуктов',
+            },
+        ),
+        migrations.RunPython(fill_price_summaries, migrations.RunPython.noop),
+    ]
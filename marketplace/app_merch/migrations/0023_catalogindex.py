@@ -0,0 +1,125 @@
+# Generated by Django 3.2.18 on 2026-10-18 07:50
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Max, Min, Sum, When
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def fill_catalog_index(apps, schema_editor):
+    """
+    Заполнение индекса каталога существующими продуктами.
+    Расчет повторяет CatalogIndexService на исторических моделях миграции.
+    """
+
+    Product = apps.get_model("app_merch", "Product")
+    Offer = apps.get_model("app_merch", "Offer")
+    ProductPriceSummary = apps.get_model("app_merch", "ProductPriceSummary")
+    CatalogIndex = apps.get_model("app_merch", "CatalogIndex")
+
+    product_ids = list(
+        Product.objects.filter(is_active=True).order_by("pk").values_list("pk", flat=True)
+    )
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        offers_data = {
+            data["product_id"]: data
+            for data in Offer.objects.filter(product_id__in=batch, is_active=True)
+            .values("product_id")
+            .annotate(
+                min_price=Min("price"),
+                max_price=Max("price"),
+                any_in_stock=Max(
+                    Case(When(quantity__gt=0, then=1), default=0, output_field=IntegerField())
+                ),
+                any_free_delivery=Max(
+                    Case(When(is_delivery_free=True, then=1), default=0, output_field=IntegerField())
+                ),
+            )
+        }
+        views = dict(
+            Offer.objects.filter(product_id__in=batch)
+            .values("product_id")
+            .annotate(views=Sum("total_views"))
+            .values_list("product_id", "views")
+        )
+        summaries = ProductPriceSummary.objects.in_bulk(batch)
+        products = (
+            Product.objects.filter(pk__in=offers_data.keys())
+            .select_related("category", "icon")
+            .prefetch_related("tags")
+        )
+
+        rows = []
+        for product in products:
+            data = offers_data[product.pk]
+            summary = summaries.get(product.pk)
+            tag_ids = sorted({tag.pk for tag in product.tags.all()})
+            rows.append(
+                CatalogIndex(
+                    product=product,
+                    title=product.title,
+                    icon_file=product.icon.file.name if product.icon else "",
+                    created_at=product.created_at,
+                    category=product.category,
+                    category_title=product.category.title,
+                    category_tree_id=product.category.tree_id,
+                    category_lft=product.category.lft,
+                    category_rght=product.category.rght,
+                    tag_ids=f",{','.join(map(str, tag_ids))}," if tag_ids else "",
+                    min_price=data["min_price"],
+                    max_price=data["max_price"],
+                    avg_price=summary.avg_price if summary else None,
+                    avg_discount_price=summary.avg_discount_price if summary else None,
+                    has_discount=summary.has_active_discount if summary else False,
+                    any_in_stock=bool(data["any_in_stock"]),
+                    any_free_delivery=bool(data["any_free_delivery"]),
+                    total_views=views.get(product.pk) or 0,
+                    review_count=summary.review_count if summary else 0,
+                )
+            )
+        CatalogIndex.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0022_productpricesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogIndex',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalog_index', serialize=False, to='app_merch.product', verbose_name='продукт')),
+                ('title', models.CharField(max_length=150, verbose_name='название')),
+                ('icon_file', models.CharField(blank=True, max_length=100, verbose_name='изображение продукта')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='дата создания')),
+                ('category_title', models.CharField(max_length=150, verbose_name='наименование категории')),
+                ('category_tree_id', models.PositiveIntegerField(verbose_name='дерево категории')),
+                ('category_lft', models.PositiveIntegerField(verbose_name='левая граница категории')),
+                ('category_rght', models.PositiveIntegerField(verbose_name='правая граница категории')),
+                ('tag_ids', models.CharField(blank=True, max_length=255, verbose_name='id тэгов')),
+                ('min_price', models.DecimalField(db_index=True, decimal_places=2, max_digits=9, verbose_name='минимальная цена')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='максимальная цена')),
+                ('avg_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='средняя цена')),
+                ('avg_discount_price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='средняя цена с учетом скидки')),
+                ('has_discount', models.BooleanField(default=False, verbose_name='есть активная скидка')),
+                ('any_in_stock', models.BooleanField(default=False, verbose_name='есть в наличии')),
+                ('any_free_delivery', models.BooleanField(default=False, verbose_name='есть бесплатная доставка')),
+                ('total_views', models.PositiveIntegerField(db_index=True, default=0, verbose_name='количество просмотров')),
+                ('review_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='количество отзывов')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_index', to='app_merch.category', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'Индекс каталога',
+                'verbose_name_plural': 'Индекс каталога',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='catalogindex',
+            index=models.Index(fields=['category_tree_id', 'category_lft', 'category_rght'], name='catalog_index_category_idx'),
+        ),
+        migrations.RunPython(fill_catalog_index, migrations.RunPython.noop),
+    ]
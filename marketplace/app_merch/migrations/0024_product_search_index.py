@@ -0,0 +1,105 @@
+from django.db import migrations
+
+SEARCH_TABLE = "app_merch_productsearch"
+BATCH_SIZE = 500
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Создание таблицы полнотекстового поиска продуктов.
+    Для SQLite - виртуальная таблица FTS5, для PostgreSQL - таблица с tsvector и GIN индексом.
+    Для прочих СУБД таблица не создается, поиск выполняется по вхождению подстроки в название.
+    """
+
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "title, description, tags, characters, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {SEARCH_TABLE} ("
+            "product_id bigint PRIMARY KEY "
+            "REFERENCES app_merch_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)"
+        )
+    else:
+        return
+
+    fill_search_index(apps, schema_editor)
+
+
+def flatten_characters(characters):
+    """ Разворачивание вложенных характеристик продукта в список строк. """
+
+    if isinstance(characters, dict):
+        words = []
+        for key, value in characters.items():
+            words.append(str(key))
+            words.extend(flatten_characters(value))
+        return words
+    if isinstance(characters, (list, tuple)):
+        return [word for value in characters for word in flatten_characters(value)]
+    if characters is None:
+        return []
+    return [str(characters)]
+
+
+def fill_search_index(apps, schema_editor):
+    """
+    Индексация существующих продуктов, чтобы поиск работал сразу после миграции.
+    Документы строятся по историческим моделям миграции.
+    """
+
+    Product = apps.get_model("app_merch", "Product")
+    if schema_editor.connection.vendor == "sqlite":
+        sql = (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, tags, characters, description) "
+            "VALUES (%s, %s, %s, %s, %s)"
+        )
+    else:
+        sql = (
+            f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C') || "
+            "setweight(to_tsvector('simple', %s), 'D'))"
+        )
+
+    product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            products = Product.objects.filter(
+                pk__in=product_ids[start:start + BATCH_SIZE]
+            ).prefetch_related("tags")
+            cursor.executemany(sql, [
+                (
+                    product.pk,
+                    product.title,
+                    " ".join(tag.title for tag in product.tags.all()),
+                    " ".join(flatten_characters(product.characters)),
+                    product.description,
+                )
+                for product in products
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0023_catalogindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
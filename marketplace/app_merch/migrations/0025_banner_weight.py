@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0024_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text='Чем больше вес, тем чаще показывается баннер. Баннер с весом 0 не показывается.', verbose_name='вес'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:03
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def copy_offer_views(apps, schema_editor):
+    """ Перенос просмотров, накопленных в предложениях, в продукты. """
+
+    Offer = apps.get_model("app_merch", "Offer")
+    Product = apps.get_model("app_merch", "Product")
+    views = Offer.objects.values("product_id").annotate(views=Sum("total_views")).filter(views__gt=0)
+    products = [Product(pk=data["product_id"], total_views=data["views"]) for data in views]
+    Product.objects.bulk_update(products, ["total_views"], batch_size=500)
+
+    CatalogIndex = apps.get_model("app_merch", "CatalogIndex")
+    CatalogIndex.objects.update(
+        total_views=Subquery(
+            Product.objects.filter(pk=OuterRef("product_id")).values("total_views")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0025_banner_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_views',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество просмотров'),
+        ),
+        migrations.RunPython(copy_offer_views, migrations.RunPython.noop),
+    ]
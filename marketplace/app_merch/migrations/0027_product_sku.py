@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0026_product_total_views'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Внешний артикул, по которому импорт находит существующий продукт.', max_length=64, null=True, unique=True, verbose_name='артикул'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0027_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'в очереди'), ('running', 'выполняется'), ('completed', 'завершено'), ('failed', 'прервано')], default='pending', max_length=16, verbose_name='статус')),
+                ('files', models.JSONField(default=list, verbose_name='файлы')),
+                ('mode', models.CharField(default='create', max_length=16, verbose_name='режим')),
+                ('batch_size', models.PositiveIntegerField(blank=True, null=True, verbose_name='размер пачки')),
+                ('chunk_size', models.PositiveIntegerField(blank=True, null=True, verbose_name='размер части')),
+                ('workers', models.PositiveIntegerField(blank=True, null=True, verbose_name='количество частей файла')),
+                ('deactivate_missing', models.BooleanField(default=False, verbose_name='отключать отсутствующие продукты')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='E-mail для отчета')),
+                ('email_sent', models.BooleanField(blank=True, null=True, verbose_name='отчет отправлен')),
+                ('deactivated', models.PositiveIntegerField(default=0, verbose_name='отключено продуктов')),
+                ('message', models.TextField(blank=True, verbose_name='сообщение')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='дата завершения')),
+            ],
+            options={
+                'verbose_name': 'Задание импорта',
+                'verbose_name_plural': 'Задания импорта',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportRowError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filepath', models.CharField(max_length=512, verbose_name='путь к файлу')),
+                ('index', models.PositiveIntegerField(verbose_name='номер записи')),
+                ('offset', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='смещение записи')),
+                ('message', models.TextField(verbose_name='ошибка')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_errors', to='app_merch.importjob', verbose_name='задание')),
+            ],
+            options={
+                'verbose_name': 'Ошибка импорта',
+                'verbose_name_plural': 'Ошибки импорта',
+                'ordering': ['job', 'filepath', 'index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filepath', models.CharField(max_length=512, verbose_name='путь к файлу')),
+                ('start', models.PositiveBigIntegerField(default=0, verbose_name='начало части')),
+                ('end', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='конец части')),
+                ('first_index', models.PositiveIntegerField(default=1, verbose_name='номер первой записи')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='количество записей')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='смещение контрольной точки')),
+                ('next_index', models.PositiveIntegerField(default=1, verbose_name='номер записи контрольной точки')),
+                ('created', models.PositiveIntegerField(default=0, verbose_name='добавлено')),
+                ('updated', models.PositiveIntegerField(default=0, verbose_name='обновлено')),
+                ('unchanged', models.PositiveIntegerField(default=0, verbose_name='без изменений')),
+                ('errors', models.PositiveIntegerField(default=0, verbose_name='ошибок')),
+                ('status', models.CharField(choices=[('pending', 'в очереди'), ('running', 'выполняется'), ('completed', 'завершено'), ('failed', 'прервано')], default='pending', max_length=16, verbose_name='статус')),
+                ('message', models.TextField(blank=True, verbose_name='сообщение')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='app_merch.importjob', verbose_name='задание')),
+            ],
+            options={
+                'verbose_name': 'Часть файла импорта',
+                'verbose_name_plural': 'Части файлов импорта',
+                'ordering': ['job', 'filepath', 'first_index'],
+            },
+        ),
+    ]
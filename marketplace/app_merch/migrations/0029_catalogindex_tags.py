@@ -0,0 +1,62 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def copy_tag_ids(apps, schema_editor):
+    """ Перенос id тэгов из строки вида ',1,5,' в связи индекса каталога с тэгами. """
+
+    CatalogIndex = apps.get_model("app_merch", "CatalogIndex")
+    Tag = apps.get_model("app_merch", "Tag")
+    CatalogIndexTags = CatalogIndex.tags.through
+
+    tag_ids = set(Tag.objects.values_list("pk", flat=True))
+    rows = []
+    for product_id, row_tag_ids in CatalogIndex.objects.exclude(tag_ids="").values_list(
+        "product_id", "tag_ids"
+    ).iterator():
+        rows.extend(
+            CatalogIndexTags(catalogindex_id=product_id, tag_id=int(tag_id))
+            for tag_id in filter(None, row_tag_ids.split(","))
+            if int(tag_id) in tag_ids
+        )
+    CatalogIndexTags.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def copy_tags(apps, schema_editor):
+    """ Обратный перенос связей индекса каталога с тэгами в строку id тэгов. """
+
+    CatalogIndex = apps.get_model("app_merch", "CatalogIndex")
+
+    tag_ids = {}
+    for product_id, tag_id in CatalogIndex.tags.through.objects.values_list(
+        "catalogindex_id", "tag_id"
+    ).iterator():
+        tag_ids.setdefault(product_id, set()).add(tag_id)
+
+    rows = list(CatalogIndex.objects.filter(pk__in=tag_ids.keys()))
+    for row in rows:
+        row.tag_ids = f",{','.join(map(str, sorted(tag_ids[row.pk])))},"
+    CatalogIndex.objects.bulk_update(rows, ["tag_ids"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0028_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogindex',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='catalog_index', to='app_merch.Tag', verbose_name='тэги'),
+        ),
+        migrations.RunPython(copy_tag_ids, copy_tags),
+        migrations.RemoveField(
+            model_name='catalogindex',
+            name='tag_ids',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0029_catalogindex_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importchunk',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата обновления'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-18 08:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_merch', '0030_import_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='offer',
+            name='total_views',
+        ),
+    ]
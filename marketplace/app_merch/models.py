@@ -1,5 +1,4 @@
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
@@ -59,18 +58,6 @@ class Category(MPTTModel):
     def get_absolute_url(self):
         return reverse("categories_detail", kwargs={"slug": self.slug})
 
-    def save(self, *args, **kwargs):
-        """Сброс кеша после изменения или добавления категории."""
-        if cache.get("Categories"):
-            cache.delete("Categories")
-        super().save()
-
-    def delete(self, *args, **kwargs):
-        """Сброс кеша после удаления категории."""
-        if cache.get("Categories"):
-            cache.delete("Categories")
-        super().delete()
-
 
 class Tag(models.Model):
     """
@@ -116,6 +103,17 @@ class Product(models.Model):
     media = models.ManyToManyField(Image, verbose_name="медиафайлы продукта")
     characters = models.JSONField(verbose_name="характеристики")
     is_active = models.BooleanField(default=False, verbose_name='активность')
+    total_views = models.PositiveIntegerField(
+        default=0, verbose_name="количество просмотров"
+    )
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="артикул",
+        help_text="Внешний артикул, по которому импорт находит существующий продукт.",
+    )
 
     class Meta:
         verbose_name = "Продукт"
@@ -124,6 +122,21 @@ class Product(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, update_fields=None, **kwargs):
+        """
+        Сохранение существующего продукта без поля total_views:
+        просмотры прибавляются к нему в БД счетчиком просмотров,
+        и загруженное ранее значение затерло бы сброшенные с тех пор просмотры.
+        """
+
+        if update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "total_views"
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     def best_offer(self):
         return self.offers.first()
 
@@ -172,9 +185,6 @@ class Offer(models.Model):
     is_delivery_free = models.BooleanField(
         default=False, verbose_name="бесплатная доставка"
     )
-    total_views = models.PositiveIntegerField(
-        default=0, verbose_name="количество просмотров"
-    )
 
     class Meta:
         verbose_name = "Предложение"
@@ -185,6 +195,122 @@ class Offer(models.Model):
         return f"{self.product} from {self.seller}"
 
 
+class ProductPriceSummary(models.Model):
+    """
+    Модель сводной информации о ценах продукта.
+    Пересчитывается при изменении предложений, скидок и отзывов.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="price_summary",
+        verbose_name="продукт",
+    )
+    min_price = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True, verbose_name="минимальная цена"
+    )
+    max_price = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True, verbose_name="максимальная цена"
+    )
+    avg_price = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True, verbose_name="средняя цена"
+    )
+    avg_discount_price = models.DecimalField(
+        max_digits=9,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="средняя цена с учетом скидки",
+    )
+    has_active_discount = models.BooleanField(
+        default=False, verbose_name="есть активная скидка"
+    )
+    offer_count = models.PositiveIntegerField(
+        default=0, verbose_name="количество предложений"
+    )
+    review_count = models.PositiveIntegerField(
+        default=0, verbose_name="количество отзывов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="дата обновления")
+
+    class Meta:
+        verbose_name = "Сводка цен продукта"
+        verbose_name_plural = "Сводки цен продуктов"
+
+    def __str__(self):
+        return f"{self.product_id}: {self.min_price} - {self.max_price}"
+
+
+class CatalogIndex(models.Model):
+    """
+    Модель индекса каталога: одна строка на активный продукт с активными предложениями.
+    Хранит все данные для фильтрации, сортировки и вывода карточек каталога,
+    чтобы каталог работал запросами к одной таблице.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="catalog_index",
+        verbose_name="продукт",
+    )
+    title = models.CharField(max_length=150, verbose_name="название")
+    icon_file = models.CharField(max_length=100, blank=True, verbose_name="изображение продукта")
+    created_at = models.DateTimeField(db_index=True, verbose_name="дата создания")
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="catalog_index",
+        verbose_name="категория",
+    )
+    category_title = models.CharField(max_length=150, verbose_name="наименование категории")
+    category_tree_id = models.PositiveIntegerField(verbose_name="дерево категории")
+    category_lft = models.PositiveIntegerField(verbose_name="левая граница категории")
+    category_rght = models.PositiveIntegerField(verbose_name="правая граница категории")
+    tags = models.ManyToManyField(
+        Tag, related_name="catalog_index", blank=True, verbose_name="тэги"
+    )
+    min_price = models.DecimalField(
+        max_digits=9, decimal_places=2, db_index=True, verbose_name="минимальная цена"
+    )
+    max_price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name="максимальная цена")
+    avg_price = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True, verbose_name="средняя цена"
+    )
+    avg_discount_price = models.DecimalField(
+        max_digits=9,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="средняя цена с учетом скидки",
+    )
+    has_discount = models.BooleanField(default=False, verbose_name="есть активная скидка")
+    any_in_stock = models.BooleanField(default=False, verbose_name="есть в наличии")
+    any_free_delivery = models.BooleanField(default=False, verbose_name="есть бесплатная доставка")
+    total_views = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="количество просмотров"
+    )
+    review_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="количество отзывов"
+    )
+
+    class Meta:
+        verbose_name = "Индекс каталога"
+        verbose_name_plural = "Индекс каталога"
+        indexes = [
+            models.Index(
+                fields=["category_tree_id", "category_lft", "category_rght"],
+                name="catalog_index_category_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
 class SetOfProducts(models.Model):
     """
     Модель наборов товаров.
@@ -314,6 +440,11 @@ class Banner(models.Model):
     file = models.ForeignKey(Image, on_delete=models.CASCADE, verbose_name="медиа файл")
     is_active = models.BooleanField(default=True, verbose_name="активность")
     link = models.URLField(verbose_name="ссылка")
+    weight = models.PositiveIntegerField(
+        default=1,
+        verbose_name="вес",
+        help_text="Чем больше вес, тем чаще показывается баннер. Баннер с весом 0 не показывается.",
+    )
 
     class Meta:
         verbose_name = "Баннер"
@@ -322,20 +453,6 @@ class Banner(models.Model):
     def __str__(self):
         return self.title
 
-    def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
-    ):
-        """Сброс кеша при изменении или добавлении баннера."""
-        if cache.get("Banners"):
-            cache.delete("Banners")
-        super().save()
-
-    def delete(self, using=None, keep_parents=False):
-        """Сброс кеша при удалении баннера."""
-        if cache.get("Banners"):
-            cache.delete("Banners")
-        super().delete()
-
 
 class Review(models.Model):
     profile = models.ForeignKey(
@@ -379,3 +496,110 @@ class WatchedProduct(models.Model):
 
     class Meta:
         ordering = ["view_date"]
+
+
+class ImportJob(models.Model):
+    """
+    Модель задания импорта товаров.
+    Файлы задания делятся на части (ImportChunk), которые импортируются параллельно,
+    итоги задания складываются из итогов частей.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUSES = (
+        (STATUS_PENDING, "в очереди"),
+        (STATUS_RUNNING, "выполняется"),
+        (STATUS_COMPLETED, "завершено"),
+        (STATUS_FAILED, "прервано"),
+    )
+
+    status = models.CharField(
+        max_length=16, choices=STATUSES, default=STATUS_PENDING, verbose_name="статус"
+    )
+    files = models.JSONField(default=list, verbose_name="файлы")
+    mode = models.CharField(max_length=16, default="create", verbose_name="режим")
+    batch_size = models.PositiveIntegerField(null=True, blank=True, verbose_name="размер пачки")
+    chunk_size = models.PositiveIntegerField(null=True, blank=True, verbose_name="размер части")
+    workers = models.PositiveIntegerField(null=True, blank=True, verbose_name="количество частей файла")
+    deactivate_missing = models.BooleanField(
+        default=False, verbose_name="отключать отсутствующие продукты"
+    )
+    email = models.EmailField(blank=True, verbose_name="E-mail для отчета")
+    email_sent = models.BooleanField(null=True, blank=True, verbose_name="отчет отправлен")
+    deactivated = models.PositiveIntegerField(default=0, verbose_name="отключено продуктов")
+    message = models.TextField(blank=True, verbose_name="сообщение")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="дата обновления")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="дата завершения")
+
+    class Meta:
+        verbose_name = "Задание импорта"
+        verbose_name_plural = "Задания импорта"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.pk}. {self.get_status_display()}"
+
+
+class ImportChunk(models.Model):
+    """
+    Модель части файла задания импорта.
+    offset и next_index - контрольная точка: смещение в байтах и номер первой
+    записи, которые еще не сохранены. Они обновляются в одной транзакции с пачкой продуктов,
+    поэтому прерванная часть продолжается с последней сохраненной пачки.
+    updated_at обновляется с каждой контрольной точкой и служит признаком того, что часть импортируется.
+    """
+
+    job = models.ForeignKey(
+        ImportJob, on_delete=models.CASCADE, related_name="chunks", verbose_name="задание"
+    )
+    filepath = models.CharField(max_length=512, verbose_name="путь к файлу")
+    start = models.PositiveBigIntegerField(default=0, verbose_name="начало части")
+    end = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="конец части")
+    first_index = models.PositiveIntegerField(default=1, verbose_name="номер первой записи")
+    total = models.PositiveIntegerField(default=0, verbose_name="количество записей")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="смещение контрольной точки")
+    next_index = models.PositiveIntegerField(default=1, verbose_name="номер записи контрольной точки")
+    created = models.PositiveIntegerField(default=0, verbose_name="добавлено")
+    updated = models.PositiveIntegerField(default=0, verbose_name="обновлено")
+    unchanged = models.PositiveIntegerField(default=0, verbose_name="без изменений")
+    errors = models.PositiveIntegerField(default=0, verbose_name="ошибок")
+    status = models.CharField(
+        max_length=16,
+        choices=ImportJob.STATUSES,
+        default=ImportJob.STATUS_PENDING,
+        verbose_name="статус",
+    )
+    message = models.TextField(blank=True, verbose_name="сообщение")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="дата обновления")
+
+    class Meta:
+        verbose_name = "Часть файла импорта"
+        verbose_name_plural = "Части файлов импорта"
+        ordering = ["job", "filepath", "first_index"]
+
+    def __str__(self):
+        return f"{self.filepath}: {self.first_index}"
+
+
+class ImportRowError(models.Model):
+    """ Модель ошибки импорта строки файла. """
+
+    job = models.ForeignKey(
+        ImportJob, on_delete=models.CASCADE, related_name="row_errors", verbose_name="задание"
+    )
+    filepath = models.CharField(max_length=512, verbose_name="путь к файлу")
+    index = models.PositiveIntegerField(verbose_name="номер записи")
+    offset = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="смещение записи")
+    message = models.TextField(verbose_name="ошибка")
+
+    class Meta:
+        verbose_name = "Ошибка импорта"
+        verbose_name_plural = "Ошибки импорта"
+        ordering = ["job", "filepath", "index"]
+
+    def __str__(self):
+        return f"{self.filepath}: {self.index}"
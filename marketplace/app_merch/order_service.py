@@ -1,7 +1,7 @@
 from datetime import datetime
+from typing import Iterable
 
 from django.db import transaction
-from django.db.models import QuerySet
 
 from app_basket.models import Cart
 from app_users.models import (
@@ -13,6 +13,7 @@ from app_users.models import (
     Payment,
     OrderItem
 )
+from .discount_service import CartLine
 
 
 class OrderCreation:
@@ -94,7 +95,7 @@ class OrderCreation:
         return Order.objects.get_or_create(buyer=buyer, payment_status='not_paid')[0]
 
     @staticmethod
-    def complete_order(order: Order, cart_items: QuerySet, status: str, cart: Cart = None) -> None:
+    def complete_order(order: Order, cart_items: Iterable[CartLine], status: str, cart: Cart = None) -> None:
         """ Метод подтверждения заказа пользователя. """
 
         with transaction.atomic():
@@ -115,12 +116,12 @@ class OrderCreation:
             order.save()
 
     @staticmethod
-    def add_items_to_order(order: Order, cart_items: QuerySet) -> None:
-        """ Метод добавления товаров в заказ. """
+    def add_items_to_order(order: Order, cart_items: Iterable[CartLine]) -> None:
+        """ Метод добавления позиций корзины в заказ. """
 
         for i_item in cart_items:
             OrderItem.objects.create(
                 order=order,
-                offer=i_item,
-                quantity=i_item.amount
+                offer=i_item.offer,
+                quantity=i_item.quantity
             )
@@ -0,0 +1,114 @@
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count
+
+from .discount_service import DiscountService
+from .models import Offer, Product, ProductPriceSummary, Review
+
+
+class PriceSummaryService:
+    """ Сервис для пересчета сводной информации о ценах продуктов. """
+
+    batch_size = 500
+    discount_service = DiscountService()
+
+    def rebuild(self, product_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Метод пересчета сводной информации для переданных продуктов.
+        Если продукты не переданы, пересчитывается информация по всем продуктам.
+        Возвращает количество пересчитанных продуктов.
+        """
+
+        products = Product.objects.all()
+        if product_ids is not None:
+            products = products.filter(pk__in={pk for pk in product_ids if pk})
+        product_ids = list(products.order_by("pk").values_list("pk", flat=True))
+
+        for start in range(0, len(product_ids), self.batch_size):
+            self.rebuild_batch(product_ids[start:start + self.batch_size])
+
+        return len(product_ids)
+
+    def rebuild_batch(self, product_ids: List[int]) -> None:
+        """ Метод пересчета сводной информации для пачки продуктов. """
+
+        summaries = self.calculate_batch(product_ids)
+        with transaction.atomic():
+            ProductPriceSummary.objects.filter(product_id__in=product_ids).delete()
+            ProductPriceSummary.objects.bulk_create(summaries)
+
+    def calculate_batch(self, product_ids: List[int]) -> List[ProductPriceSummary]:
+        """ Метод расчета сводной информации для пачки продуктов без сохранения в БД. """
+
+        offers_by_product = {}
+        for offer in Offer.objects.filter(product_id__in=product_ids):
+            offers_by_product.setdefault(offer.product_id, []).append(offer)
+
+        discounts = self.discount_service.get_active_discounts(product_ids)
+        review_counts = dict(
+            Review.objects.filter(offer__product_id__in=product_ids, is_active=True)
+            .values("offer__product_id")
+            .annotate(count=Count("pk"))
+            .values_list("offer__product_id", "count")
+        )
+
+        return [
+            self.make_summary(
+                product_id=product_id,
+                offers=offers_by_product.get(product_id, []),
+                discounts=discounts,
+                review_count=review_counts.get(product_id, 0),
+            )
+            for product_id in product_ids
+        ]
+
+    def make_summary(
+        self, product_id: int, offers: list, discounts: dict, review_count: int
+    ) -> ProductPriceSummary:
+        """ Метод формирования сводной информации по уже загруженным данным продукта. """
+
+        (
+            offers_with_discount,
+            offers_without_discount,
+        ) = self.discount_service.get_offers_with_and_without_discount(offers, discounts)
+        prices = [offer.price for offer in offers]
+        discount = discounts.get(product_id)
+
+        return ProductPriceSummary(
+            product_id=product_id,
+            min_price=min(prices) if prices else None,
+            max_price=max(prices) if prices else None,
+            avg_price=self.round_price(self.discount_service.calculate_average_price(offers)),
+            avg_discount_price=self.round_price(
+                self.discount_service.calculate_average_with_discount(
+                    offers_with_discount, offers_without_discount
+                ) if offers else None
+            ),
+            has_active_discount=bool(discount and discount.size > 0),
+            offer_count=len(offers),
+            review_count=review_count,
+        )
+
+    @staticmethod
+    def round_price(price) -> Optional[Decimal]:
+        """ Метод округления цены до копеек. """
+
+        return Decimal(price).quantize(Decimal("1.00")) if price is not None else None
+
+    def get_summary(self, product_id: int) -> ProductPriceSummary:
+        """
+        Метод получения сводной информации о продукте.
+        При ее отсутствии значения рассчитываются на лету без сохранения,
+        пересчет сохраненной информации выполняют сигналы и миграция заполнения.
+        """
+
+        product_id = getattr(product_id, "pk", product_id)
+        summary = ProductPriceSummary.objects.filter(product_id=product_id).first()
+        if summary is None:
+            summary = self.calculate_batch([product_id])[0]
+        return summary
+
+
+price_summary_service = PriceSummaryService()
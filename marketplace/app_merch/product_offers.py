@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.db.models import QuerySet
+
+from app_users.models import Seller
+
+from .models import Offer, Product
+
+
+@dataclass(frozen=True)
+class ProductOffersView:
+    """
+    Предложения продукта вместе с продавцами и их профилями.
+    Список продавцов и поиск предложения продавца строятся по уже загруженным
+    предложениям, без дополнительных запросов к БД.
+    """
+
+    product: Product
+    offers: Tuple[Offer, ...]
+
+    @staticmethod
+    def get_queryset() -> QuerySet:
+        """ Queryset предложений для Prefetch("offers", ...) при загрузке продукта. """
+
+        return Offer.objects.select_related("seller__profile")
+
+    @classmethod
+    def load(cls, product: Product) -> "ProductOffersView":
+        """
+        Метод получения предложений продукта.
+        Если предложения уже загружены через prefetch_related, запрос к БД не выполняется.
+        """
+
+        if "offers" in getattr(product, "_prefetched_objects_cache", {}):
+            offers = product.offers.all()
+        else:
+            offers = cls.get_queryset().filter(product=product)
+        return cls(product=product, offers=tuple(offers))
+
+    @property
+    def sellers(self) -> Tuple[Seller, ...]:
+        """ Продавцы продукта без повторений в порядке предложений. """
+
+        return tuple({offer.seller_id: offer.seller for offer in self.offers}.values())
+
+    def get_offer(self, seller_id) -> Optional[Offer]:
+        """ Метод получения предложения продавца. """
+
+        for offer in self.offers:
+            if str(offer.seller_id) == str(seller_id):
+                return offer
+        return None
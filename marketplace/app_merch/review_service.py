@@ -1,16 +1,21 @@
-from app_users.models import Profile, Seller
-from django.http import HttpResponseRedirect
-from django.shortcuts import get_object_or_404, render
+from typing import List
+
+from app_users.models import Profile
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import render
 
 from .forms import ReviewForm
-from .models import Offer, Review
+from .models import Review
+from .product_offers import ProductOffersView
 
 
 def new_review(request, product):
     form = ReviewForm(request.POST)
+    product_offers = ProductOffersView.load(product)
     if form.is_valid():
-        seller_id = request.POST.get("seller")
-        offer = get_object_or_404(Offer, product=product, seller__id=seller_id)
+        offer = product_offers.get_offer(request.POST.get("seller"))
+        if offer is None:
+            raise Http404("У продукта нет предложения этого продавца")
         profile, created = Profile.objects.get_or_create(user=request.user)
         review = Review.objects.create(
             profile=profile,
@@ -20,20 +25,27 @@ def new_review(request, product):
         )
         return HttpResponseRedirect(request.path_info)
     else:
+        reviews = get_product_reviews(product)
         context = {
             "form": form,
             "product": product,
-            "reviews": Review.objects.filter(offer__product=product, is_active=True),
-            "sellers": Seller.objects.filter(
-                profile__in=[
-                    offer.seller.profile
-                    for offer in Offer.objects.filter(product=product)
-                ]
-            ),
+            "reviews": reviews,
+            "review_count": len(reviews),
+            "sellers": product_offers.sellers,
         }
         return render(request, "products/product_detail.html", context)
 
 
+def get_product_reviews(product) -> List[Review]:
+    """ Активные отзывы о продукте вместе с авторами и продавцами. """
+
+    return list(
+        Review.objects.filter(offer__product=product, is_active=True).select_related(
+            "profile__user", "profile__avatar", "offer__seller"
+        )
+    )
+
+
 def review_count(product):
     count = Review.objects.filter(offer__product=product, is_active=True).count()
     return count
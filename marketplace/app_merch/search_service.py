@@ -0,0 +1,302 @@
+import re
+from typing import Dict, Iterable, List, Optional, Union
+
+from django.db import connection, transaction
+from django.db.models import FloatField, QuerySet, Value
+from django.db.models.expressions import Expression, RawSQL
+
+from .models import Product
+
+SEARCH_TABLE = "app_merch_productsearch"
+
+
+class SearchBackend:
+    """
+    Базовый поисковый бэкенд без индекса:
+    поиск по вхождению подстроки в название продукта, без ранжирования.
+    """
+
+    def update(self, documents: Dict[int, dict]) -> None:
+        pass
+
+    def remove(self, product_ids: List[int]) -> None:
+        pass
+
+    def search(self, query: str, limit: int) -> List[int]:
+        return list(
+            Product.objects.filter(title__icontains=query)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+
+    def match(self, query: str) -> Union[QuerySet, RawSQL, list]:
+        """ Подзапрос id всех подходящих продуктов для фильтра pk__in, без ограничения количества. """
+
+        return Product.objects.filter(title__icontains=query).values("pk")
+
+    def rank(self, query: str, column: str) -> Expression:
+        """
+        Выражение ранга продукта по запросу для сортировки по возрастанию.
+        column - столбец внешнего запроса с id продукта.
+        """
+
+        return Value(0.0, output_field=FloatField())
+
+    @staticmethod
+    def get_terms(query: str) -> List[str]:
+        """ Метод разбиения поискового запроса на слова, пригодные для запроса к индексу. """
+
+        return re.findall(r"\w+", query.lower())
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Поисковый бэкенд на виртуальной таблице SQLite FTS5.
+    rowid таблицы совпадает с id продукта, результаты ранжируются по bm25,
+    совпадение в названии весит больше, чем в тэгах, описании и характеристиках.
+    """
+
+    weights = (10.0, 1.0, 4.0, 2.0)
+
+    def get_match(self, query: str) -> Optional[str]:
+        terms = self.get_terms(query)
+        return " ".join(f'"{term}"*' for term in terms) if terms else None
+
+    def update(self, documents: Dict[int, dict]) -> None:
+        with connection.cursor() as cursor:
+            self.remove(list(documents))
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, tags, characters) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [
+                    (
+                        product_id,
+                        document["title"],
+                        document["description"],
+                        document["tags"],
+                        document["characters"],
+                    )
+                    for product_id, document in documents.items()
+                ],
+            )
+
+    def remove(self, product_ids: List[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(product_id,) for product_id in product_ids],
+            )
+
+    def search(self, query: str, limit: int) -> List[int]:
+        match = self.get_match(query)
+        if match is None:
+            return []
+
+        weights = ", ".join(map(str, self.weights))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def match(self, query: str) -> Union[QuerySet, RawSQL, list]:
+        match = self.get_match(query)
+        if match is None:
+            return []
+        return RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match])
+
+    def rank(self, query: str, column: str) -> Expression:
+        match = self.get_match(query)
+        if match is None:
+            return super().rank(query, column)
+
+        # bm25 отрицателен и тем меньше, чем релевантнее продукт.
+        weights = ", ".join(map(str, self.weights))
+        return RawSQL(
+            f"SELECT bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {column}",
+            [match],
+            output_field=FloatField(),
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Поисковый бэкенд на PostgreSQL: документ продукта хранится в столбце tsvector
+    с GIN индексом, результаты ранжируются по ts_rank с весами частей документа.
+    """
+
+    config = "simple"
+
+    def update(self, documents: Dict[int, dict]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'C') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'D')) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [
+                    (
+                        product_id,
+                        document["title"],
+                        document["tags"],
+                        document["characters"],
+                        document["description"],
+                    )
+                    for product_id, document in documents.items()
+                ],
+            )
+
+    def remove(self, product_ids: List[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE product_id = ANY(%s)", [list(product_ids)]
+            )
+
+    def get_ts_query(self, query: str) -> Optional[str]:
+        terms = self.get_terms(query)
+        return " & ".join(f"{term}:*" for term in terms) if terms else None
+
+    def search(self, query: str, limit: int) -> List[int]:
+        ts_query = self.get_ts_query(query)
+        if ts_query is None:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id FROM {SEARCH_TABLE}, to_tsquery('{self.config}', %s) query "
+                "WHERE document @@ query "
+                "ORDER BY ts_rank(document, query) DESC, product_id LIMIT %s",
+                [ts_query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def match(self, query: str) -> Union[QuerySet, RawSQL, list]:
+        ts_query = self.get_ts_query(query)
+        if ts_query is None:
+            return []
+        return RawSQL(
+            f"SELECT product_id FROM {SEARCH_TABLE} "
+            f"WHERE document @@ to_tsquery('{self.config}', %s)",
+            [ts_query],
+        )
+
+    def rank(self, query: str, column: str) -> Expression:
+        ts_query = self.get_ts_query(query)
+        if ts_query is None:
+            return super().rank(query, column)
+
+        return RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('{self.config}', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE product_id = {column}",
+            [ts_query],
+            output_field=FloatField(),
+        )
+
+
+class SearchService:
+    """
+    Сервис полнотекстового поиска продуктов.
+    Индексируются название, описание, названия тэгов и характеристики продукта.
+    Бэкенд выбирается по используемой СУБД.
+    """
+
+    batch_size = 500
+    search_limit = 500
+    backends = {
+        "sqlite": SqliteSearchBackend,
+        "postgresql": PostgresSearchBackend,
+    }
+
+    @property
+    def backend(self) -> SearchBackend:
+        return self.backends.get(connection.vendor, SearchBackend)()
+
+    def index_products(self, product_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Метод обновления поискового индекса для переданных продуктов.
+        Если продукты не переданы, индекс перестраивается полностью.
+        Возвращает количество проиндексированных продуктов.
+        """
+
+        if product_ids is None:
+            product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+        else:
+            product_ids = sorted({pk for pk in product_ids if pk})
+
+        indexed = 0
+        for start in range(0, len(product_ids), self.batch_size):
+            batch = product_ids[start:start + self.batch_size]
+            documents = {
+                product.pk: self.make_document(product)
+                for product in Product.objects.filter(pk__in=batch).prefetch_related("tags")
+            }
+            with transaction.atomic():
+                self.backend.remove([pk for pk in batch if pk not in documents])
+                self.backend.update(documents)
+            indexed += len(documents)
+
+        return indexed
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        """ Метод удаления продуктов из поискового индекса. """
+
+        self.backend.remove(list(product_ids))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """ Метод поиска продуктов, возвращает id продуктов в порядке релевантности. """
+
+        return self.backend.search(query, limit or self.search_limit)
+
+    def filter(self, queryset: QuerySet, query: str, field: str = "pk") -> QuerySet:
+        """
+        Метод фильтрации queryset по поисковому запросу.
+        Фильтр выполняется подзапросом к индексу внутри запроса queryset,
+        поэтому количество подходящих продуктов не ограничено.
+        """
+
+        return queryset.filter(**{f"{field}__in": self.backend.match(query)})
+
+    def annotate_rank(self, queryset: QuerySet, query: str, field: str = "pk") -> QuerySet:
+        """
+        Метод добавления к queryset поля search_rank для сортировки по релевантности.
+        Ранг вычисляется индексом внутри запроса queryset, меньший ранг - более релевантный продукт.
+        """
+
+        opts = queryset.model._meta
+        target = opts.pk if field == "pk" else opts.get_field(field)
+        column = f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(target.column)}"
+        return queryset.annotate(search_rank=self.backend.rank(query, column))
+
+    def make_document(self, product: Product) -> dict:
+        """ Метод формирования поискового документа продукта. """
+
+        return {
+            "title": product.title,
+            "description": product.description,
+            "tags": " ".join(tag.title for tag in product.tags.all()),
+            "characters": " ".join(self.flatten_characters(product.characters)),
+        }
+
+    @classmethod
+    def flatten_characters(cls, characters) -> List[str]:
+        """ Метод разворачивания вложенных характеристик продукта в список строк. """
+
+        if isinstance(characters, dict):
+            words = []
+            for key, value in characters.items():
+                words.append(str(key))
+                words.extend(cls.flatten_characters(value))
+            return words
+        if isinstance(characters, (list, tuple)):
+            return [word for value in characters for word in cls.flatten_characters(value)]
+        if characters is None:
+            return []
+        return [str(characters)]
+
+
+search_service = SearchService()
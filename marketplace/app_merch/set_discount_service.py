@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from django.utils import timezone
+
+from app_settings import cache_tags
+
+from .models import ProductGroup, SetDiscount, SetOfProducts
+
+
+@dataclass(frozen=True)
+class SetDiscountTerms:
+    """ Условия скидки на набор товаров. """
+
+    is_percent: bool
+    size: int
+    start_date: object
+    end_date: object
+
+    def is_current(self, current_time) -> bool:
+        return (
+            self.start_date is not None
+            and self.end_date is not None
+            and self.start_date <= current_time <= self.end_date
+        )
+
+    def calculate(self, summ: Decimal) -> Decimal:
+        if self.is_percent:
+            return summ * self.size / 100
+        return Decimal(self.size)
+
+
+@dataclass(frozen=True)
+class SetOfProductsRule:
+    """ Набор товаров в индексе: группы в виде множеств id продуктов и его скидки. """
+
+    pk: int
+    name: str
+    groups: Tuple[FrozenSet[int], ...]
+    discounts: Tuple[SetDiscountTerms, ...]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def product_ids(self) -> FrozenSet[int]:
+        return frozenset().union(*self.groups)
+
+    def get_discount(self, current_time) -> Optional[SetDiscountTerms]:
+        return next((terms for terms in self.discounts if terms.is_current(current_time)), None)
+
+
+@dataclass(frozen=True)
+class SetOfProductsIndex:
+    """ Индекс наборов товаров: наборы по id и id наборов по id входящих в них продуктов. """
+
+    sets: Dict[int, SetOfProductsRule]
+    sets_by_product: Dict[int, FrozenSet[int]]
+
+    def get_candidates(self, product_ids: Iterable[int]) -> Iterable[SetOfProductsRule]:
+        set_ids = set()
+        for product_id in product_ids:
+            set_ids.update(self.sets_by_product.get(product_id, ()))
+        return (self.sets[set_id] for set_id in sorted(set_ids))
+
+
+class SetDiscountService:
+    """
+    Сервис расчета скидок на наборы товаров.
+    Наборы, их группы и продукты загружаются один раз в индекс, который хранится в кеше
+    и сбрасывается при изменении наборов, групп или скидок на наборы.
+    """
+
+    index_key = "Set discounts index"
+    index_tag = "set-discounts"
+
+    def get_index(self) -> SetOfProductsIndex:
+        """ Метод получения индекса наборов товаров. """
+
+        return cache_tags.get_or_set(self.index_key, self.build_index, None, tags=[self.index_tag])
+
+    def invalidate(self) -> None:
+        """ Метод сброса индекса наборов товаров. """
+
+        cache_tags.invalidate_tags(self.index_tag)
+
+    @staticmethod
+    def build_index() -> SetOfProductsIndex:
+        """ Метод построения индекса наборов товаров за фиксированное количество запросов. """
+
+        products_by_group = {}
+        for group_id, product_id in ProductGroup.products.through.objects.values_list(
+            "productgroup_id", "product_id"
+        ):
+            products_by_group.setdefault(group_id, set()).add(product_id)
+
+        groups_by_set = {}
+        for set_id, group_id in SetOfProducts.product_groups.through.objects.values_list(
+            "setofproducts_id", "productgroup_id"
+        ):
+            groups_by_set.setdefault(set_id, []).append(group_id)
+
+        discounts_by_set = {}
+        for discount in SetDiscount.objects.filter(
+            is_active=True, set_of_products__isnull=False
+        ).order_by("pk"):
+            discounts_by_set.setdefault(discount.set_of_products_id, []).append(
+                SetDiscountTerms(
+                    is_percent=discount.is_percent,
+                    size=discount.size or 0,
+                    start_date=discount.start_date,
+                    end_date=discount.end_date,
+                )
+            )
+
+        sets = {
+            set_id: SetOfProductsRule(
+                pk=set_id,
+                name=name,
+                groups=tuple(
+                    frozenset(products_by_group.get(group_id, ()))
+                    for group_id in sorted(groups_by_set.get(set_id, ()))
+                ),
+                discounts=tuple(discounts_by_set.get(set_id, ())),
+            )
+            for set_id, name in SetOfProducts.objects.values_list("pk", "name")
+        }
+
+        sets_by_product = {}
+        for rule in sets.values():
+            for product_id in rule.product_ids:
+                sets_by_product.setdefault(product_id, set()).add(rule.pk)
+
+        return SetOfProductsIndex(
+            sets=sets,
+            sets_by_product={
+                product_id: frozenset(set_ids)
+                for product_id, set_ids in sets_by_product.items()
+            },
+        )
+
+    def get_best_set_discount(
+        self, cart_lines: Iterable[Tuple[int, Decimal]]
+    ) -> Optional[Tuple[SetOfProductsRule, Decimal]]:
+        """
+        Метод поиска самой выгодной скидки на набор для товаров корзины.
+        Принимает пары (id продукта, стоимость позиции с учетом количества).
+        Набор считается представленным в корзине полностью, если в ней есть товары
+        из каждой его группы. Возвращает (набор, сумма скидки) или None.
+        """
+
+        totals = {}
+        for product_id, total_price in cart_lines:
+            totals[product_id] = totals.get(product_id, 0) + total_price
+        if not totals:
+            return None
+
+        current_time = timezone.now()
+        cart_product_ids = frozenset(totals)
+        best = None
+        for rule in self.get_index().get_candidates(cart_product_ids):
+            if not rule.groups or not all(group & cart_product_ids for group in rule.groups):
+                continue
+            terms = rule.get_discount(current_time)
+            if terms is None:
+                continue
+            summ = Decimal(
+                sum(totals[product_id] for product_id in rule.product_ids & cart_product_ids)
+            ).quantize(Decimal("1.00"))
+            summ_discount = terms.calculate(summ).quantize(Decimal("1.00"))
+            if best is None or summ_discount > best[1]:
+                best = (rule, summ_discount)
+
+        return best
+
+
+set_discount_service = SetDiscountService()
@@ -0,0 +1,179 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from app_basket.cart import invalidate_cart_prices
+from app_settings import cache_tags
+from .banner_rotation_service import banner_rotation_service
+from .catalog_cache_service import catalog_cache_service
+from .catalog_index_service import catalog_index_service
+from .category_tree import category_tree_service
+from .models import (Banner, CartDiscount, Category, Discount, Offer, Product,
+                     ProductGroup, Review, SetDiscount, SetOfProducts, Tag)
+from .price_summary_service import price_summary_service
+from .search_service import search_service
+from .set_discount_service import set_discount_service
+
+
+def refresh_products(product_ids):
+    """ Пересчет сводной информации о ценах и индекса каталога для продуктов. """
+
+    product_ids = list(product_ids)
+    price_summary_service.rebuild(product_ids)
+    catalog_index_service.rebuild(product_ids)
+
+
+@receiver([post_save, post_delete], sender=Offer)
+def offer_changed(sender, instance, **kwargs):
+    """ Пересчет сводной информации о ценах при изменении предложения. """
+
+    refresh_products([instance.product_id])
+    cache_tags.invalidate_tags("offers", f"seller:{instance.seller_id}")
+
+
+@receiver([post_save, post_delete], sender=Discount)
+def discount_changed(sender, instance, **kwargs):
+    """ Пересчет сводной информации о ценах при изменении скидки на продукт. """
+
+    if instance.product_id:
+        refresh_products([instance.product_id])
+    cache_tags.invalidate_tags("discounts")
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """ Пересчет количества отзывов при изменении отзыва. """
+
+    refresh_products(
+        Offer.objects.filter(pk=instance.offer_id).values_list("product_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    """ Пересчет строки индекса каталога и поискового индекса при изменении продукта. """
+
+    catalog_index_service.rebuild([instance.pk])
+    search_service.index_products([instance.pk])
+    cache_tags.invalidate_tags("products", f"product:{instance.pk}")
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """ Удаление продукта из поискового индекса. """
+
+    search_service.remove_products([instance.pk])
+    cache_tags.invalidate_tags("products", f"product:{instance.pk}")
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Пересчет тэгов в индексе каталога и поисковом индексе при изменении тэгов продукта.
+    При очистке продуктов тэга pk_set не передается, поэтому продукты тэга
+    запоминаются до очистки.
+    """
+
+    if action == "pre_clear" and reverse:
+        instance._cleared_product_ids = list(instance.products.values_list("pk", flat=True))
+        return
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == "post_clear":
+        product_ids = getattr(instance, "_cleared_product_ids", [])
+    else:
+        product_ids = pk_set or []
+    if product_ids:
+        refresh_product_tags(product_ids)
+
+
+def refresh_product_tags(product_ids):
+    """ Пересчет тэгов продуктов в индексе каталога и поисковом индексе. """
+
+    product_ids = list(product_ids)
+    catalog_index_service.rebuild(product_ids)
+    search_service.index_products(product_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    """ Запоминание продуктов удаляемого тэга: после удаления связи с ними уже удалены. """
+
+    instance._deleted_product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_changed(sender, instance, signal, **kwargs):
+    """
+    Обновление названия тэга в поисковом индексе продуктов с этим тэгом,
+    удаление тэга из индексов продуктов удаленного тэга
+    и сброс страниц каталога, в которых выводятся популярные тэги.
+    """
+
+    if signal is post_delete:
+        refresh_product_tags(getattr(instance, "_deleted_product_ids", []))
+    else:
+        search_service.index_products(instance.products.values_list("pk", flat=True))
+    catalog_cache_service.invalidate()
+
+
+@receiver(post_init, sender=Category)
+def category_loaded(sender, instance, **kwargs):
+    """
+    Запоминание дерева и родителя загруженной категории.
+    MPTT перемещает категорию в дереве до сигнала pre_save, поэтому прежнее дерево берется отсюда.
+    """
+
+    instance._loaded_tree = (instance.__dict__.get("tree_id"), instance.__dict__.get("parent_id"))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, created=False, **kwargs):
+    """
+    Обновление индекса каталога и дерева категорий при изменении категорий.
+    Изменение вложенной категории затрагивает только ее прежнее и новое деревья,
+    изменение корневой категории может сдвинуть номера других деревьев.
+    """
+
+    previous_tree_id, previous_parent_id = (
+        (instance.tree_id, instance.parent_id) if created else instance._loaded_tree
+    )
+    tree_ids = None
+    if None not in (instance.parent_id, previous_parent_id, previous_tree_id):
+        tree_ids = {instance.tree_id, previous_tree_id}
+    catalog_index_service.refresh_categories(tree_ids)
+    instance._loaded_tree = (instance.tree_id, instance.parent_id)
+    category_tree_service.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def banner_changed(sender, **kwargs):
+    """ Сброс пула ротации баннеров при изменении баннера. """
+
+    banner_rotation_service.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Offer)
+@receiver([post_save, post_delete], sender=Discount)
+@receiver([post_save, post_delete], sender=SetDiscount)
+@receiver([post_save, post_delete], sender=SetOfProducts)
+@receiver([post_save, post_delete], sender=ProductGroup)
+@receiver([post_save, post_delete], sender=CartDiscount)
+@receiver(m2m_changed, sender=SetOfProducts.product_groups.through)
+@receiver(m2m_changed, sender=ProductGroup.products.through)
+def cart_prices_changed(sender, **kwargs):
+    """ Сброс закешированных стоимостей корзин при изменении цен или скидок. """
+
+    invalidate_cart_prices()
+
+
+@receiver([post_save, post_delete], sender=SetDiscount)
+@receiver([post_save, post_delete], sender=SetOfProducts)
+@receiver([post_save, post_delete], sender=ProductGroup)
+@receiver(m2m_changed, sender=SetOfProducts.product_groups.through)
+@receiver(m2m_changed, sender=ProductGroup.products.through)
+def set_discounts_changed(sender, **kwargs):
+    """ Сброс индекса наборов товаров при изменении наборов, групп или скидок на наборы. """
+
+    set_discount_service.invalidate()
@@ -1,7 +1,13 @@
-from typing import Union
+from dataclasses import asdict
+from typing import List, Optional, Union
 
+from celery import chord
+
+from app_merch.catalog_index_service import catalog_index_service
 from app_merch.import_service import ImportProductsService
+from app_merch.models import ImportChunk, ImportJob
 from app_merch.payment_service import pay_for_the_order
+from app_merch.view_counter_service import view_counter_service
 from marketplace.celery import app
 
 
@@ -19,22 +25,114 @@ def send_request_to_payment_service(
 
 @app.task
 def make_an_products_importation(
-    filepath: str
+    filepath: str,
+    batch_size: Optional[int] = None,
+    mode: str = ImportProductsService.MODE_CREATE,
+    deactivate_missing: bool = False,
 ) -> bool:
     """
     Задача, которая будет добавлена в очередь на выполнение.
     Вызывает метод, парсящий JSON файл с информацией о товаре
-    для последующего добавления.
+    для последующего добавления или обновления.
     """
-    result = ImportProductsService().import_products(filepath=filepath)
+    result = ImportProductsService(
+        batch_size, mode=mode, deactivate_missing=deactivate_missing
+    ).import_products(filepath=filepath)
     return result
 
 
 @app.task
-def send_log_file_to_email(dst_email: str) -> bool:
+def run_products_import(job_id: int) -> int:
     """
-    Задача, которая будет добавлена в очередь на выполнение.
-    Вызывает метод, отправляющий лог файл на переданный E-mail.
+    Задача запуска или продолжения задания импорта.
+    При первом запуске делит файлы на части, затем импортирует незавершенные части
+    группой задач на всех воркерах, после чего задача finish_products_import подводит итоги.
+    Если часть или итоговая задача завершится ошибкой, задание отмечается прерванным.
+    Возвращает количество запущенных частей.
     """
-    result = ImportProductsService().send_log(dst_email)
-    return result
+    job = ImportJob.objects.get(pk=job_id)
+    chunk_ids = ImportProductsService.for_job(job).prepare_job(job)
+    if chunk_ids:
+        chord(import_products_chunk.si(chunk_id) for chunk_id in chunk_ids)(
+            finish_products_import.si(job_id).on_error(fail_products_import.si(job_id))
+        )
+    else:
+        finish_products_import.delay(job_id)
+    return len(chunk_ids)
+
+
+@app.task
+def import_products_chunk(chunk_id: int) -> dict:
+    """
+    Задача импорта части файла задания с ее контрольной точки.
+    Возвращает итоги импорта части.
+    """
+    chunk = ImportChunk.objects.select_related("job").get(pk=chunk_id)
+    result = ImportProductsService.for_job(chunk.job).import_chunk(chunk)
+    return asdict(result)
+
+
+@app.task
+def finish_products_import(job_id: int) -> dict:
+    """
+    Завершающая задача задания импорта: переносит файлы, отключает отсутствующие продукты
+    и отправляет итоги на E-mail. Возвращает состояние задания.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    return ImportProductsService.for_job(job).finish_job(job)
+
+
+@app.task
+def fail_products_import(job_id: int) -> bool:
+    """
+    Задача обработки ошибки группы задач импорта: отмечает задание прерванным,
+    чтобы его можно было продолжить. Возвращает признак отметки задания.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    return ImportProductsService.fail_job(job)
+
+
+def start_products_import(
+    filepaths: List[str],
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    mode: str = ImportProductsService.MODE_CREATE,
+    deactivate_missing: bool = False,
+    dst_email: Optional[str] = None,
+) -> ImportJob:
+    """
+    Создание и запуск задания параллельного импорта файлов.
+    Каждый файл делится на части по chunk_size записей (или на workers частей).
+    """
+    job = ImportProductsService(
+        batch_size, mode=mode, deactivate_missing=deactivate_missing
+    ).create_job(filepaths, chunk_size=chunk_size, workers=workers, email=dst_email)
+    run_products_import.delay(job.pk)
+    return job
+
+
+def resume_products_import(job: ImportJob) -> ImportJob:
+    """ Продолжение прерванного задания импорта с контрольных точек его частей. """
+    job.status = ImportJob.STATUS_PENDING
+    job.save(update_fields=["status", "updated_at"])
+    run_products_import.delay(job.pk)
+    return job
+
+
+@app.task
+def rebuild_catalog_index() -> int:
+    """
+    Периодическая задача полной перестройки индекса каталога.
+    Подстраховывает точечные обновления индекса по сигналам.
+    """
+    return catalog_index_service.rebuild()
+
+
+@app.task
+def flush_product_views() -> int:
+    """
+    Периодическая задача сброса накопленных просмотров продуктов в БД.
+    Возвращает количество учтенных просмотров.
+    """
+    return view_counter_service.flush()
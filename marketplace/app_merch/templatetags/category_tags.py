@@ -1,21 +1,10 @@
-from app_merch.models import Category
-from app_settings.models import SiteSettings
+from app_merch.category_tree import category_tree_service
 from django import template
-from django.core.cache import cache
 
 register = template.Library()
 
 
-@register.simple_tag()
+@register.simple_tag
 def get_categories():
-    """Тег для получения категорий."""
-    time_to_cache = SiteSettings.load().time_to_cache
-
-    if not time_to_cache:
-        time_to_cache = 1
-
-    return cache.get_or_set(
-        "Categories",
-        Category.objects.filter(is_active=True),
-        time_to_cache * 60 * 60 * 24,
-    )
+    """Тег для получения меню категорий из дерева категорий процесса."""
+    return category_tree_service.get_tree().menu
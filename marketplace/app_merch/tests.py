@@ -1,3 +1,149 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+import fakeredis
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app_users.models import Profile, Seller
+
+from .import_service import ImportProductsService
+from .models import Category, Discount, ImportChunk, ImportJob, Offer, Product, Review, Tag
+from .view_counter_service import ViewCounterService, view_counter_service
+
+
+class DetailViewsQueriesTest(TestCase):
+    """ Количество запросов детальных страниц не должно зависеть от количества предложений и отзывов. """
+
+    # Два запроса - UPDATE просмотров продукта и индекса каталога без буфера Redis.
+    product_detail_queries = 8
+    discount_detail_queries = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Категория", slug="category")
+        cls.product = Product.objects.create(
+            title="Продукт", description="Описание", category=category, characters={}, is_active=True
+        )
+        cls.product.tags.add(Tag.objects.create(title="Тэг"))
+        now = timezone.now()
+        cls.discount = Discount.objects.create(
+            product=cls.product,
+            is_percent=True,
+            size=10,
+            description="Скидка",
+            start_date=now - timedelta(days=1),
+            end_date=now + timedelta(days=1),
+        )
+        for number in range(3):
+            cls.add_offer(number)
+
+    @classmethod
+    def add_offer(cls, number):
+        user = User.objects.create_user(f"seller{number}", password="password")
+        profile = Profile.objects.create(
+            user=user, full_name=f"Продавец {number}", phone_number=f"+7900000000{number}", address="Адрес"
+        )
+        seller = Seller.objects.create(profile=profile, title=f"Продавец {number}", description="Описание")
+        offer = Offer.objects.create(seller=seller, product=cls.product, price=100 + number, quantity=5)
+        Review.objects.create(profile=profile, offer=offer, rating=5, text="Отзыв")
+
+    def setUp(self):
+        cache.clear()
+        view_counter_service.flush()
+
+    def assertPageQueries(self, url, count):
+        self.client.get(url)
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_detail_queries(self):
+        url = reverse("pages:product-detail", args=[self.product.pk])
+        self.assertPageQueries(url, self.product_detail_queries)
+
+        for number in range(3, 6):
+            self.add_offer(number)
+        self.assertPageQueries(url, self.product_detail_queries)
+
+    def test_discount_detail_queries(self):
+        url = reverse("pages:discount_detail", args=[self.discount.pk])
+        self.assertPageQueries(url, self.discount_detail_queries)
+
+        for number in range(3, 6):
+            self.add_offer(number)
+        self.assertPageQueries(url, self.discount_detail_queries)
+
+
+class ImportJobStatusTest(TestCase):
+    """ Задание, части которого давно не обновлялись, отмечается прерванным при запросе состояния. """
+
+    def setUp(self):
+        self.job = ImportJob.objects.create(status=ImportJob.STATUS_RUNNING, files=["products.json"])
+        self.chunk = ImportChunk.objects.create(
+            job=self.job, filepath="products.json", status=ImportJob.STATUS_RUNNING
+        )
+
+    def make_stale(self, model, pk):
+        model.objects.filter(pk=pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def test_running_job_is_not_failed(self):
+        self.make_stale(ImportJob, self.job.pk)
+
+        status = ImportProductsService.get_job_status(self.job)
+        self.assertEqual(status["status"], ImportJob.STATUS_RUNNING)
+        self.assertFalse(status["finished"])
+
+    def test_stale_job_is_failed(self):
+        self.make_stale(ImportJob, self.job.pk)
+        self.make_stale(ImportChunk, self.chunk.pk)
+
+        status = ImportProductsService.get_job_status(self.job)
+        self.assertEqual(status["status"], ImportJob.STATUS_FAILED)
+        self.assertTrue(status["finished"])
+        self.assertEqual(ImportJob.objects.get(pk=self.job.pk).status, ImportJob.STATUS_FAILED)
+
+
+class ViewCounterTest(TestCase):
+    """ Просмотры, учтенные в процессе веб-сервера, сохраняются задачей сброса из другого процесса. """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Категория", slug="category")
+        cls.product = Product.objects.create(
+            title="Продукт", description="Описание", category=category, characters={}, is_active=True
+        )
+
+    def add_views(self, count):
+        """
+        Учет просмотров и сброс отдельными экземплярами сервиса, как в разных процессах.
+        Клиенты Redis экземпляров разные, сервер (fakeredis) общий.
+        """
+
+        web, beat = ViewCounterService(), ViewCounterService()
+        server = fakeredis.FakeServer()
+        web._client = fakeredis.FakeRedis(server=server)
+        beat._client = fakeredis.FakeRedis(server=server)
+        for _ in range(count):
+            web.add_view(self.product.pk)
+        return beat
+
+    def get_views(self):
+        return Product.objects.get(pk=self.product.pk).total_views
+
+    @override_settings(VIEW_COUNTER_REDIS_URL=None)
+    def test_views_without_redis(self):
+        beat = self.add_views(3)
+        self.assertEqual(self.get_views(), 3)
+        self.assertEqual(beat.flush(), 0)
+        self.assertEqual(self.get_views(), 3)
+
+    @override_settings(VIEW_COUNTER_REDIS_URL="redis://localhost:6379/14")
+    def test_views_with_redis(self):
+        beat = self.add_views(3)
+        self.assertEqual(self.get_views(), 0)
+        self.assertEqual(beat.flush(), 3)
+        self.assertEqual(self.get_views(), 3)
+        self.assertEqual(beat.flush(), 0)
@@ -0,0 +1,117 @@
+"""
+Счетчик просмотров продуктов.
+Если задан VIEW_COUNTER_REDIS_URL, просмотры не записываются в БД сразу,
+а накапливаются в хэше Redis (HINCRBY), общем для всех процессов.
+Буфер сбрасывается в БД периодической задачей Celery flush_product_views
+одним UPDATE ... SET total_views = total_views + n на каждое различное n.
+Без Redis общего буфера нет (задача выполняется в другом процессе),
+поэтому просмотр сразу прибавляется в БД: UPDATE ... SET total_views = total_views + 1.
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import CatalogIndex, Product
+
+
+class ViewCounterService:
+    """ Сервис буферизованного подсчета просмотров продуктов. """
+
+    buffer_key = "megano:product views"
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def redis_url(self):
+        return getattr(settings, "VIEW_COUNTER_REDIS_URL", None)
+
+    @property
+    def client(self):
+        if self._client is None:
+            client_class = getattr(settings, "VIEW_COUNTER_REDIS_CLIENT_CLASS", "redis.Redis")
+            self._client = import_string(client_class).from_url(self.redis_url)
+        return self._client
+
+    def add_view(self, product_id: int) -> None:
+        """ Метод учета просмотра продукта: в буфере Redis или, без Redis, сразу в БД. """
+
+        if self.redis_url:
+            self.client.hincrby(self.buffer_key, product_id, 1)
+            return
+
+        Product.objects.filter(pk=product_id).update(total_views=F("total_views") + 1)
+        CatalogIndex.objects.filter(product_id=product_id).update(total_views=F("total_views") + 1)
+
+    def pop_views(self) -> Dict[int, int]:
+        """ Метод получения и очистки накопленных в Redis просмотров. """
+
+        views = Counter()
+        if not self.redis_url:
+            return dict(views)
+
+        # Переименование атомарно: просмотры, пришедшие во время сброса, попадут в новый буфер.
+        flushing_key = f"{self.buffer_key} flushing"
+        if not self.client.exists(flushing_key):
+            if not self.client.exists(self.buffer_key):
+                return dict(views)
+            self.client.rename(self.buffer_key, flushing_key)
+        for product_id, count in self.client.hgetall(flushing_key).items():
+            views[int(product_id)] += int(count)
+        self.client.delete(flushing_key)
+
+        return dict(views)
+
+    @staticmethod
+    def group_by_count(views: Dict[int, int]) -> Dict[int, List[int]]:
+        """ Метод группировки id продуктов по количеству просмотров для общих UPDATE. """
+
+        groups = defaultdict(list)
+        for product_id, count in views.items():
+            if count > 0:
+                groups[count].append(product_id)
+        return groups
+
+    def flush(self) -> int:
+        """
+        Метод сброса накопленных просмотров в БД.
+        Возвращает количество учтенных просмотров.
+        """
+
+        views = self.pop_views()
+        if not views:
+            return 0
+
+        try:
+            self.save_views(views)
+        except Exception:
+            self.restore_views(views)
+            raise
+
+        return sum(views.values())
+
+    def save_views(self, views: Dict[int, int]) -> None:
+        with transaction.atomic():
+            for count, product_ids in self.group_by_count(views).items():
+                Product.objects.filter(pk__in=product_ids).update(
+                    total_views=F("total_views") + count
+                )
+                CatalogIndex.objects.filter(product_id__in=product_ids).update(
+                    total_views=F("total_views") + count
+                )
+
+    def restore_views(self, views: Dict[int, int]) -> None:
+        """ Метод возврата просмотров в буфер Redis, если записать их в БД не удалось. """
+
+        pipeline = self.client.pipeline()
+        for product_id, count in views.items():
+            pipeline.hincrby(self.buffer_key, product_id, count)
+        pipeline.execute()
+
+
+view_counter_service = ViewCounterService()
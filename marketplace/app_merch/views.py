@@ -1,31 +1,60 @@
-import os
+from decimal import Decimal
+from typing import List, Optional, Tuple
 
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.cache import cache
-from django.db.models import Count, Max, Min, QuerySet
-from django.shortcuts import redirect, render
-from django.urls import reverse_lazy
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Count, Min, Prefetch, Q, QuerySet
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.functional import cached_property
+from django.views.decorators.cache import never_cache
 from django.views.generic import DetailView, ListView, View, TemplateView
-from mptt.querysets import TreeQuerySet
 
 from app_basket.cart import CartService
 from app_basket.models import Cart
+from app_settings import cache_tags
 from app_settings.models import SiteSettings
-from app_users.models import DeliveryType, PaymentType, Seller, Order
-from marketplace.settings import BASE_DIR
+from app_users.models import DeliveryType, PaymentType, Order
 from . import review_service
+from .banner_rotation_service import banner_rotation_service
+from .catalog_cache_service import catalog_cache_service
+from .category_tree import CategoryNode, category_tree_service
 from .comparison_service import comparison_service
+from .cursor_pagination import CountedPaginator, CursorPage, CursorPaginator
 from .discount_service import DiscountService
+from .facet_service import CatalogFacets, facet_service
 from .forms import (OrderDeliveryDataForm, OrderUserDataForm,
                     ReviewForm, PaymentForm, ProductImportForm)
-from .models import Banner, Category, Discount, Offer, Product, Review, Tag
+from .import_service import ImportProductsService
+from .models import CatalogIndex, Discount, ImportJob, Offer, Product, Tag
 from .order_service import OrderCreation
 from .payment_service import is_active_orders
-from .tasks import send_request_to_payment_service, make_an_products_importation, send_log_file_to_email
+from .product_offers import ProductOffersView
+from .search_service import search_service
+from .tasks import send_request_to_payment_service, start_products_import
+from .view_counter_service import view_counter_service
 from .viewed_products import watched_products_service
 
+CATALOG_CARD_FIELDS = (
+    "pk",
+    "title",
+    "icon_file",
+    "category_title",
+    "min_price",
+    "avg_price",
+    "avg_discount_price",
+    "has_discount",
+)
+
+PRODUCT_CARD_PRICE_FIELDS = (
+    "price_summary__avg_price",
+    "price_summary__avg_discount_price",
+    "price_summary__has_active_discount",
+)
+
 
 class IndexView(ListView):
     """ Вью класс для главной страницы MEGANO. """
@@ -34,50 +63,37 @@ class IndexView(ListView):
     context_object_name = "products"
     model = Product
 
+    banners_count = 6
+    popular_products_count = 8
+    limited_products_count = 16
+
     def get_context_data(self, *, object_list=None, **kwargs):
+        """
+        Блоки товаров главной страницы кешируются как вычисленные списки ограниченного размера
+        со временем кеширования из настроек сайта и рассчитываются только при отсутствии в кеше.
+        Баннеры выбираются сервисом ротации баннеров.
+        """
         context = super().get_context_data()
-        banners_cache_time = SiteSettings.load().banners_cache_time
-        time_to_cache = SiteSettings.load().time_to_cache
-
-        banners = Banner.objects.filter(is_active=True).order_by('?')[:6]
-        popular_products = (Product
-                                .objects
-                                .filter(
-                                    is_active=True,
-                                    offers__is_active=True,
-                                )
-                                .values(
-                                    "pk",
-                                    "category__title",
-                                    "icon__file",
-                                    "title",
-                                    "discounts"
-                                )
-                                .annotate(min_price=Min("offers__price"))
-                                .order_by("-min_price")
-                           )
-        limited_products = popular_products.filter(offers__quantity__lt=100)
+        site_settings = SiteSettings.load(self.request)
+        time_to_cache = (site_settings.time_to_cache or 1) * 60 * 60 * 24
+        banners_cache_time = (site_settings.banners_cache_time or 1) * 60
+
+        banners = banner_rotation_service.get_banners(self.banners_count, banners_cache_time)
 
         additional_context = {
-            "banners": cache.get_or_set(
-                "Banners",
-                banners[:3],
-                banners_cache_time * 60,
-            ),
-            "semi_banners": cache.get_or_set(
-                "Semi_banners",
-                banners[3:],
-                banners_cache_time * 60,
-            ),
-            "popular_products": cache.get_or_set(
+            "banners": banners[:3],
+            "semi_banners": banners[3:],
+            "popular_products": cache_tags.get_or_set(
                 "Populars",
-                popular_products[:8],
-                time_to_cache * 60 * 60 * 24,
+                self.get_popular_products,
+                time_to_cache,
+                tags=["products", "offers", "discounts"],
             ),
-            "limited_products": cache.get_or_set(
+            "limited_products": cache_tags.get_or_set(
                 "Limited",
-                limited_products,
-                time_to_cache * 60 * 60 * 24
+                self.get_limited_products,
+                time_to_cache,
+                tags=["products", "offers", "discounts"],
             )
         }
 
@@ -85,6 +101,30 @@ class IndexView(ListView):
 
         return context
 
+    @staticmethod
+    def get_products_queryset() -> QuerySet:
+        return (
+            Product.objects.filter(is_active=True, offers__is_active=True)
+            .values(
+                "pk",
+                "category__title",
+                "icon__file",
+                "title",
+                "discounts",
+                *PRODUCT_CARD_PRICE_FIELDS,
+            )
+            .annotate(min_price=Min("offers__price"))
+            .order_by("-min_price")
+        )
+
+    def get_popular_products(self) -> list:
+        return list(self.get_products_queryset()[:self.popular_products_count])
+
+    def get_limited_products(self) -> list:
+        return list(
+            self.get_products_queryset().filter(offers__quantity__lt=100)[:self.limited_products_count]
+        )
+
 
 class AllDiscountView(ListView):
     """ View для получения всех активных скидок. """
@@ -94,34 +134,46 @@ class AllDiscountView(ListView):
 
     def get_queryset(self):
         """Получаем все доступные скидки и кешируем их на 1 день."""
-        time_to_cache = SiteSettings.load().time_to_cache
+        time_to_cache = SiteSettings.load(self.request).time_to_cache
         if not time_to_cache:
             time_to_cache = 1
         current_time = timezone.now()
 
-        return cache.get_or_set(
-            f"Discounts",
+        return cache_tags.get_or_set(
+            "Discounts",
             Product.objects.filter(discounts__is_active=True,
                                    discounts__start_date__lte=current_time,
                                    discounts__end_date__gte=current_time,),
             time_to_cache * 60 * 60 * 24,
+            tags=["products", "discounts"],
         )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         current_time = timezone.now()
-        products = Product.objects.filter(discounts__is_active=True).order_by('-discounts__is_priority')
+        products = (Product.objects
+                    .filter(discounts__is_active=True)
+                    .select_related('icon')
+                    .annotate(review_count=Count('offers__reviews',
+                                                 filter=Q(offers__reviews__is_active=True),
+                                                 distinct=True))
+                    .order_by('-discounts__is_priority'))
         discount_service = DiscountService()
+        discounts = discount_service.get_active_discounts(product.pk for product in products)
+        offers_by_product = {}
+        for offer in Offer.objects.filter(product__in=products):
+            offers_by_product.setdefault(offer.product_id, []).append(offer)
+
         product_info_list = []
         for product in products:
             icon_url = product.icon.file.url if product.icon else None
-            offers = Offer.objects.filter(product=product)
+            offers = offers_by_product.get(product.pk, [])
 
             (
                 offers_with_discount,
                 offers_without_discount,
-            ) = discount_service.get_offers_with_and_without_discount(offers)
+            ) = discount_service.get_offers_with_and_without_discount(offers, discounts)
 
             average_with_discount = discount_service.calculate_average_with_discount(
                 offers_with_discount, offers_without_discount
@@ -133,9 +185,8 @@ class AllDiscountView(ListView):
                 "icon_url": icon_url,
                 "average_price": average_price,
                 "average_with_discount": average_with_discount,
+                "review_count": product.review_count,
             }
-            review_count = review_service.review_count(product)
-            product_info['review_count'] = review_count
             product_info_list.append(product_info)
         context["product_info_list"] = product_info_list
 
@@ -148,93 +199,210 @@ class CatalogView(ListView):
     template_name = "catalog.html"
     context_object_name = "products"
     paginate_by = 8
+    cursor_kwarg = "cursor"
+    popular_tags_count = 5
 
-    def get_queryset(self):
+    def get_price_range(self) -> Optional[Tuple[Decimal, Decimal]]:
+        """ Получение границ фильтра по цене из параметра вида 'min;max'. """
+
+        price_range: str = self.request.GET.get("price")
+        if not price_range:
+            return None
+        try:
+            min_price, max_price = price_range.split(";")
+            return Decimal(min_price), Decimal(max_price)
+        except (ValueError, ArithmeticError):
+            return None
+
+    def get_filtered_queryset(self) -> QuerySet:
         """
-        Получение списка товаров по фильтру и сортировке.
-        Список кешируется на 1 день.
+        Получение индекса каталога со всеми фильтрами, кроме фильтра по цене.
+        Товары выбираются из денормализованного индекса каталога,
+        поэтому фильтры не требуют соединений с предложениями.
         """
 
-        time_to_cache: int = SiteSettings.load().time_to_cache
-        if not time_to_cache:
-            time_to_cache = 1
+        queryset: QuerySet = CatalogIndex.objects.all()
 
-        if cache.get('products'):
-            queryset = cache.get('products')
-        else:
-            queryset: QuerySet = Product.objects.filter(is_active=True, offers__is_active=True)
-            cache.set('products', queryset, time_to_cache * 60 * 60 * 24)
-
-        price_range: str = self.request.GET.get("price")
         title: str = self.request.GET.get("title")
         in_stock: str = self.request.GET.get("in_stock")
         delivery_free: str = self.request.GET.get("delivery_free")
         slug: str = self.request.GET.get("cat")
         tag = self.request.GET.get("tag")
 
-        price_sort: str = self.request.GET.get("price_sort")
-        created_at_sort: str = self.request.GET.get("created_at_sort")
-        reviews_sort: str = self.request.GET.get("reviews_sort")
-        views_sort: str = self.request.GET.get("views_sort")
-
         if slug and slug != "all":
-            category: Category = Category.objects.get(slug=slug)
-            sub_categories: TreeQuerySet = category.get_descendants(include_self=True)
-
-            queryset: QuerySet = queryset.select_related("category").filter(
-                category__in=sub_categories
-            )
-        if price_range:
-            min_price, max_price = price_range.split(";")[0], price_range.split(";")[1]
+            category: Optional[CategoryNode] = category_tree_service.get_tree().get_node(slug)
+            if category is None:
+                raise Http404("Категория не найдена")
             queryset: QuerySet = queryset.filter(
-                offers__price__range=(min_price, max_price)
+                category_tree_id=category.tree_id,
+                category_lft__gte=category.lft,
+                category_rght__lte=category.rght,
             )
         if title:
-            queryset: QuerySet = queryset.filter(title__icontains=title)
+            queryset: QuerySet = search_service.filter(queryset, title)
         if in_stock:
-            queryset: QuerySet = queryset.filter(offers__quantity__gt=0)
+            queryset: QuerySet = queryset.filter(any_in_stock=True)
         if delivery_free:
-            queryset: QuerySet = queryset.filter(offers__is_delivery_free=True)
+            queryset: QuerySet = queryset.filter(any_free_delivery=True)
         if tag:
-            queryset: QuerySet = queryset.filter(tags__pk=tag)
+            queryset: QuerySet = queryset.filter(tags=tag)
+
+        return queryset
+
+    def get_queryset(self):
+        """ Получение списка товаров по фильтру и сортировке. """
+
+        self.filtered_queryset = self.get_filtered_queryset()
+        queryset: QuerySet = self.filtered_queryset
+
+        price_range = self.get_price_range()
+        title: str = self.request.GET.get("title")
+
+        price_sort: str = self.request.GET.get("price_sort")
+        created_at_sort: str = self.request.GET.get("created_at_sort")
+        reviews_sort: str = self.request.GET.get("reviews_sort")
+        views_sort: str = self.request.GET.get("views_sort")
 
-        queryset = queryset.values(
-            "pk", "category__title", "icon__file", "title", "discounts"
-        ).annotate(min_price=Min("offers__price"))
+        if price_range:
+            queryset: QuerySet = queryset.filter(min_price__range=price_range)
 
+        ordering = ["search_rank", "pk"] if title else ["pk"]
         if price_sort in ("-min_price", "min_price"):
-            queryset: QuerySet = queryset.order_by(price_sort)
+            ordering = [price_sort, "pk"]
         if created_at_sort in ("-created_at", "created_at"):
-            queryset: QuerySet = queryset.order_by(created_at_sort)
+            ordering = [created_at_sort, "pk"]
         if reviews_sort in ("desc", "asc"):
-            queryset: QuerySet = queryset.annotate(
-                review_amount=Count("offers__reviews")
-            )
             if reviews_sort == "desc":
-                queryset: QuerySet = queryset.order_by("-review_amount")
+                ordering = ["-review_count", "pk"]
             else:
-                queryset: QuerySet = queryset.order_by("review_amount")
+                ordering = ["review_count", "pk"]
         if views_sort in ("desc", "asc"):
             if views_sort == "desc":
-                queryset: QuerySet = queryset.order_by("-offers__total_views")
+                ordering = ["-total_views", "pk"]
             else:
-                queryset: QuerySet = queryset.order_by("offers__total_views")
+                ordering = ["total_views", "pk"]
+        self.catalog_ordering = ordering
+
+        # Ранг нужен только для сортировки по релевантности, фильтр по запросу уже применен.
+        ranked = ordering[0] == "search_rank"
+        if ranked:
+            queryset: QuerySet = search_service.annotate_rank(queryset, title)
+
+        return queryset.order_by(*ordering).values(
+            *CATALOG_CARD_FIELDS,
+            "created_at",
+            "review_count",
+            "total_views",
+            *(["search_rank"] if ranked else []),
+        )
 
-        return queryset
+    @cached_property
+    def facets(self) -> CatalogFacets:
+        """ Фасеты каталога для текущего набора фильтров. """
+
+        return facet_service.get_facets(
+            self.filtered_queryset,
+            self.get_price_range(),
+            facet_service.make_filter_key(self.request.GET),
+        )
+
+    def get(self, request, *args, **kwargs):
+        """
+        Отображение страницы каталога.
+        Данные страницы берутся из кеша, при их отсутствии товары и фасеты выбираются из БД
+        и кешируются до изменения каталога.
+        """
+
+        self.page_data = catalog_cache_service.get_page(request.GET, self.make_page_data)
+        self.object_list = self.page_data["rows"]
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return CountedPaginator(
+            queryset,
+            per_page,
+            count=self.facets.count,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            **kwargs,
+        )
+
+    def make_page_data(self) -> dict:
+        """
+        Получение данных страницы каталога для кеширования: строки товаров текущей страницы,
+        данные пагинации, фасеты и популярные тэги.
+        При наличии параметра cursor используется пагинация по ключу сортировки и pk,
+        иначе - стандартная постраничная пагинация.
+        """
+
+        queryset = self.get_queryset()
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if cursor is None:
+            paginator, page, rows, is_paginated = super().paginate_queryset(
+                queryset, self.paginate_by
+            )
+            position = {"number": page.number}
+        else:
+            paginator = CursorPaginator(
+                queryset, self.paginate_by, self.catalog_ordering, count=self.facets.count
+            )
+            try:
+                page = paginator.page(cursor)
+            except InvalidPage as e:
+                raise Http404(str(e))
+            rows = page.object_list
+            position = {"next_cursor": page.next_cursor, "previous_cursor": page.previous_cursor}
+
+        return {
+            "rows": [{field: row[field] for field in CATALOG_CARD_FIELDS} for row in rows],
+            "facets": self.facets,
+            "tags": self.get_popular_tags(),
+            **position,
+        }
+
+    def paginate_queryset(self, queryset, page_size):
+        """ Пагинация по уже выбранным данным страницы каталога. """
+
+        rows = self.page_data["rows"]
+        paginator = CountedPaginator([], page_size, count=self.page_data["facets"].count)
+        if "number" in self.page_data:
+            page = Page(rows, self.page_data["number"], paginator)
+        else:
+            page = CursorPage(
+                rows, self.page_data["next_cursor"], self.page_data["previous_cursor"]
+            )
+        return paginator, page, rows, page.has_other_pages()
+
+    def get_popular_tags(self) -> List[dict]:
+        """ Получение самых частых тэгов среди отфильтрованных товаров с количеством товаров. """
+
+        top_tags = self.facets.get_top_tags(self.popular_tags_count)
+        if not top_tags:
+            return list(Tag.objects.values("pk", "title")[:self.popular_tags_count])
+
+        titles = dict(
+            Tag.objects.filter(pk__in=[tag_id for tag_id, _ in top_tags]).values_list("pk", "title")
+        )
+        return [
+            {"pk": tag_id, "title": titles[tag_id], "count": count}
+            for tag_id, count in top_tags
+            if tag_id in titles
+        ]
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """
         Получение контекста для корректного вывода отфильтрованных товаров.
         Контекст наполняется информацией касательно: тегов, макс. и мин. цены,
         категории, наименовании товара, нахождении товара в наличии, различной сортировки.
-        Данные о минимальной и максимальной цене добавляются в сессию для
-        последующего получения значения из неё.
+        Границы цен и счетчики берутся из фасетов каталога.
         """
         context = super().get_context_data(**kwargs)
 
-        context["tags"] = Tag.objects.all()[:5]
+        context["facets"] = self.page_data["facets"]
+        context["tags"] = self.page_data["tags"]
 
-        price_range: str = self.request.GET.get("price")
+        price_range = self.get_price_range()
         category: str = self.request.GET.get("cat")
         title: str = self.request.GET.get("title")
         in_stock: str = self.request.GET.get("in_stock")
@@ -245,47 +413,13 @@ class CatalogView(ListView):
         reviews_sort: str = self.request.GET.get("reviews_sort")
         views_sort: str = self.request.GET.get("views_sort")
 
-        min_price = self.object_list.aggregate(Min("offers__price"))[
-            "offers__price__min"
-        ]
-        max_price = self.object_list.aggregate(Max("offers__price"))[
-            "offers__price__max"
-        ]
-
-        if not self.request.session.get("min_price") or not self.request.session.get(
-            "max_price"
-        ):
-            self.request.session["min_price"] = str(min_price)
-            self.request.session["max_price"] = str(max_price)
-        else:
-            session_min_price = self.request.session.get("min_price", min_price)
-            session_max_price = self.request.session.get("max_price", min_price)
-
-            if str(min_price) > session_min_price:
-                min_price = session_min_price
-
-            if str(max_price) < session_max_price:
-                max_price = session_max_price
-
-            if session_min_price == "None" and session_max_price == "None":
-                min_price = self.object_list.aggregate(Min("offers__price"))[
-                    "offers__price__min"
-                ]
-                max_price = self.object_list.aggregate(Max("offers__price"))[
-                    "offers__price__max"
-                ]
-
         if price_range:
-            curr_min_price, curr_max_price = (
-                price_range.split(";")[0],
-                price_range.split(";")[1],
-            )
-            context["curr_min_price"], context["curr_max_price"] = (
-                curr_min_price,
-                curr_max_price,
-            )
+            context["curr_min_price"], context["curr_max_price"] = price_range
 
-        context["min_price"], context["max_price"] = min_price, max_price
+        context["min_price"], context["max_price"] = (
+            context["facets"].min_price,
+            context["facets"].max_price,
+        )
 
         if category and category != "all":
             context["category"] = category
@@ -308,69 +442,86 @@ class CatalogView(ListView):
         if price_sort or created_at_sort or reviews_sort or views_sort:
             context["any_sort"] = True
 
-        return context
+        context["cursor_mode"] = self.cursor_kwarg in self.request.GET
 
+        return context
 
-class ProductDetailView(DetailView):
-    model = Product
-    template_name = "products/product_detail.html"
-    context_object_name = "product"
 
-    def get(self, request, *args, **kwargs):
-        watched_products_service.add_product(request=request, product=self.get_object())
-        offer = Offer.objects.filter(product_id=self.kwargs['pk']).first()
-        offer.total_views += 1
-        offer.save()
-        return super(ProductDetailView, self).get(request, *args, **kwargs)
+class ProductPricesMixin:
+    """ Миксин расчета цен продукта по заранее загруженным предложениям и скидке. """
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        product = self.get_object()
-        context["icon_url"] = product.icon.file.url if product.icon else None
-        context["media"] = product.media.all()
+    def get_prices_context(self, product_offers: ProductOffersView) -> dict:
+        """
+        Метод получения данных о ценах продукта для шаблона.
+        Продукт должен быть загружен со скидкой, тогда расчет не обращается к БД.
+        """
 
-        offers = Offer.objects.filter(product=self.object)
+        product = product_offers.product
+        offers = list(product_offers.offers)
+        discount = getattr(product, "discounts", None)
+        discounts = {product.pk: discount} if discount and discount.is_active else {}
 
         discount_service = DiscountService()
-
         average_price = discount_service.calculate_average_price(offers)
-        context["average_price"] = average_price
-
         (
             offers_with_discount,
             offers_without_discount,
-        ) = discount_service.get_offers_with_and_without_discount(offers)
-
+        ) = discount_service.get_offers_with_and_without_discount(offers, discounts)
         average_with_discount = discount_service.calculate_average_with_discount(
             offers_with_discount, offers_without_discount
         )
-        context["average_with_discount"] = average_with_discount
-
         price_difference = discount_service.calculate_price_difference(
             average_price, average_with_discount
         )
-        percentage_difference = discount_service.calculate_percentage_difference(
-            price_difference, average_price
-        )
-        context["percentage_difference"] = percentage_difference
 
-        offers_combined = (
-            discount_service.combine_offers_with_discount_and_without_discount(
+        return {
+            "average_price": average_price,
+            "average_with_discount": average_with_discount,
+            "percentage_difference": discount_service.calculate_percentage_difference(
+                price_difference, average_price
+            ),
+            "offers_combined": discount_service.combine_offers_with_discount_and_without_discount(
                 offers_with_discount, offers_without_discount
-            )
-        )
+            ),
+        }
 
-        context["offers_combined"] = offers_combined
 
-        reviews = Review.objects.filter(offer__product=self.object, is_active=True)
-        context["reviews"] = reviews
-        review_count = review_service.review_count(product)
-        context["review_count"] = review_count
+class ProductDetailView(ProductPricesMixin, DetailView):
+    """
+    View детальной страницы продукта.
+    Продукт загружается один раз вместе с изображениями, категорией, скидкой, тэгами
+    и предложениями с продавцами, поэтому количество запросов не зависит от числа предложений.
+    """
 
-        sellers = Seller.objects.filter(
-            profile__in=[offer.seller.profile for offer in offers]
+    model = Product
+    template_name = "products/product_detail.html"
+    context_object_name = "product"
+
+    def get_queryset(self):
+        return Product.objects.select_related("icon", "category", "discounts").prefetch_related(
+            "media", "tags", Prefetch("offers", queryset=ProductOffersView.get_queryset())
         )
-        context["sellers"] = sellers
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        watched_products_service.add_product(request=request, product=self.object)
+        view_counter_service.add_view(self.object.pk)
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        product = self.object
+        context["icon_url"] = product.icon.file.url if product.icon else None
+        context["media"] = product.media.all()
+
+        product_offers = ProductOffersView.load(product)
+        context.update(self.get_prices_context(product_offers))
+
+        reviews = review_service.get_product_reviews(product)
+        context["reviews"] = reviews
+        context["review_count"] = len(reviews)
+        context["sellers"] = product_offers.sellers
 
         if self.request.user.is_authenticated:
             form = ReviewForm()
@@ -494,10 +645,10 @@ class OrderPurchaseView(View):
 
     def get(self, *args, **kwargs):
         self.request.session["step"] = 4
-        cart = CartService(self.request)
+        result = DiscountService().calculate_cart(CartService(self.request).cart)
         context = {
-            "cart_items": cart.get_cart_item_list(),
-            "total_price": DiscountService().get_total_price_cart(cart=cart.cart.pk)
+            "cart_items": result.lines,
+            "total_price": result.total,
         }
         return render(self.request, "orders/order_purchase.html", context=context)
 
@@ -529,43 +680,26 @@ class DiscountListView(ListView):
         return context
 
 
-class DiscountDetailView(DetailView):
+class DiscountDetailView(ProductPricesMixin, DetailView):
     model = Discount
     template_name = "discounts/discount_detail.html"
     context_object_name = "discount"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        discount = self.get_object()
-        context["icon_url"] = discount.product.icon.file.url if discount.product.icon else None
-        product = discount.product
-        context["media"] = product.media.all()
-
-        offers = Offer.objects.filter(product=product)
-        discount_service = DiscountService()
-
-        (
-            offers_with_discount,
-            offers_without_discount,
-        ) = discount_service.get_offers_with_and_without_discount(offers)
-
-        average_with_discount = discount_service.calculate_average_with_discount(
-            offers_with_discount, offers_without_discount
+    def get_queryset(self):
+        return Discount.objects.select_related("product__icon").prefetch_related(
+            "product__tags", Prefetch("product__offers", queryset=ProductOffersView.get_queryset())
         )
 
-        average_price = discount_service.calculate_average_price(offers)
-        context["average_price"] = average_price
-        context["average_with_discount"] = average_with_discount
-
-        price_difference = discount_service.calculate_price_difference(
-            average_price, average_with_discount
-        )
-        percentage_difference = discount_service.calculate_percentage_difference(
-            price_difference, average_price
-        )
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        product = self.object.product
+        # Скидка уже загружена, повторно не запрашиваем ее через продукт.
+        product.discounts = self.object
+        context["icon_url"] = product.icon.file.url if product.icon else None
 
-        print(average_price, average_with_discount, percentage_difference)
-        context["percentage_difference"] = percentage_difference
+        prices = self.get_prices_context(ProductOffersView.load(product))
+        prices.pop("offers_combined")
+        context.update(prices)
 
         return context
 
@@ -587,7 +721,8 @@ class PaymentView(LoginRequiredMixin, View):
         form = PaymentForm(self.request.POST)
         cart = Cart.objects.filter(buyer=self.request.user.profile.buyer).first()
         order = Order.objects.get(buyer=self.request.user.profile.buyer, payment_status='not_paid')
-        amount = DiscountService().get_total_price_cart(cart=cart) if cart else order.total_price(order)
+        result = DiscountService().calculate_cart(cart) if cart else None
+        amount = result.total if result else order.total_price(order)
 
         if form.is_valid():
             result = send_request_to_payment_service.delay(
@@ -604,7 +739,7 @@ class PaymentView(LoginRequiredMixin, View):
             OrderCreation.complete_order(
                 order=order,
                 cart=cart,
-                cart_items=CartService(self.request).get_cart_item_list(),
+                cart_items=result.lines if result else (),
                 status=result_status
             )
 
@@ -654,25 +789,33 @@ class ComparisonView(TemplateView):
 
 @staff_member_required
 def import_products(request):
-    """ View для импортирования товаров. """
+    """
+    View для импортирования товаров.
+    Загруженные файлы сохраняются, и задание импорта ставится в очередь без ожидания результата,
+    после чего страница задания опрашивает его состояние.
+    """
 
     if request.method == 'POST':
         form = ProductImportForm(request.POST, request.FILES)
-        context = {'form': form}
         if form.is_valid():
-            json_files = request.FILES.getlist('json_file')
-            for file in json_files:
-                filepath = os.path.join(BASE_DIR, 'imports', 'waiting', str(file))
-                result = make_an_products_importation.delay(filepath=filepath).get()
-                context['success'] = 'True' if result else 'False'
-
-            result = send_log_file_to_email.delay(dst_email=request.POST.get('email')).get()
-            context['email_sent'] = 'True' if result else 'False'
-
-        return render(request, 'products/import-products.html', context)
+            filepaths = ImportProductsService.save_uploaded_files(request.FILES.getlist('json_file'))
+            job = start_products_import(filepaths, dst_email=form.cleaned_data['email'])
+            return redirect(f"{reverse('pages:import_page')}?job={job.pk}")
+        return render(request, 'products/import-products.html', {'form': form})
     else:
         form = ProductImportForm()
-        return render(request, 'products/import-products.html', {'form': form})
+        job_id = request.GET.get('job', '')
+        job = ImportJob.objects.filter(pk=job_id).first() if job_id.isdigit() else None
+        return render(request, 'products/import-products.html', {'form': form, 'job': job})
+
+
+@never_cache
+@staff_member_required
+def import_job_status(request, pk):
+    """ View состояния задания импорта в JSON. """
+
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse(ImportProductsService.get_job_status(job))
 
 
 def add_to_comparison_list(request, *args, **kwargs):
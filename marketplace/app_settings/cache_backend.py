@@ -0,0 +1,318 @@
+"""
+Двухуровневый кеш.
+L1 - ограниченный по количеству записей LRU кеш процесса с коротким временем жизни,
+L2 - общий для всех процессов Redis.
+Любая запись в кеш добавляет измененные ключи в журнал инвалидации - поток Redis
+ограниченной длины. Процессы читают новые записи журнала не чаще раза
+в INVALIDATION_POLL_INTERVAL секунд и удаляют из своего L1 только эти ключи,
+поэтому изменения, сделанные другим процессом, видны не позже, чем через этот интервал.
+Если процесс отстал больше, чем на длину журнала, его L1 очищается целиком.
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+_clients = {}
+_l1_caches = {}
+_l1_locks = {}
+
+INTEGER_RE = re.compile(rb"^-?\d+$")
+
+
+class TwoTierRedisCache(BaseCache):
+    """
+    Бэкенд кеша Django: LRU кеш процесса перед общим Redis.
+    Параметры OPTIONS:
+    CLIENT_CLASS - класс клиента Redis, для локальной проверки без Redis - 'fakeredis.FakeRedis';
+    L1_MAX_ENTRIES - максимальное количество записей в L1;
+    L1_TIMEOUT - время жизни записи в L1 в секундах;
+    INVALIDATION_POLL_INTERVAL - интервал чтения журнала инвалидации в секундах;
+    INVALIDATION_LOG_SIZE - количество записей в журнале инвалидации.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._server = server
+        options = params.get("OPTIONS", {})
+        self._client_class = options.get("CLIENT_CLASS", "redis.Redis")
+        self._l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._l1_timeout = float(options.get("L1_TIMEOUT", 5))
+        self._poll_interval = float(options.get("INVALIDATION_POLL_INTERVAL", 1))
+        self._log_size = int(options.get("INVALIDATION_LOG_SIZE", 1000))
+        self._log_key = self.make_key("L1 invalidations")
+
+        name = f"{self._client_class} {server} {self.key_prefix}"
+        self._l1 = _l1_caches.setdefault(
+            name, {"entries": OrderedDict(), "last_id": None, "polled_at": 0, "pid": None}
+        )
+        self._lock = _l1_locks.setdefault(name, threading.Lock())
+
+    @property
+    def client(self):
+        key = (self._client_class, self._server)
+        if key not in _clients:
+            _clients[key] = import_string(self._client_class).from_url(self._server)
+        return _clients[key]
+
+    # Сериализация: целые числа хранятся в Redis как есть, чтобы работал INCRBY.
+
+    @staticmethod
+    def encode(value) -> bytes:
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(data: bytes):
+        if INTEGER_RE.match(data):
+            return int(data)
+        return pickle.loads(data)
+
+    def validate_key(self, key):
+        """ Ключи Redis могут содержать пробелы и быть длиннее ключей memcached, проверка не нужна. """
+
+    def get_redis_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """ Время жизни записи в Redis в секундах, None - без ограничения. """
+
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(0, int(timeout))
+
+    # L1
+
+    @property
+    def origin(self) -> str:
+        """
+        Идентификатор L1 процесса в журнале инвалидации, по которому процесс
+        пропускает свои записи. При первом обращении процесса, в том числе после fork,
+        L1 очищается, и журнал читается с его текущего конца.
+        """
+
+        if self._l1["pid"] != os.getpid():
+            newest = self.client.xrevrange(self._log_key, count=1)
+            with self._lock:
+                if self._l1["pid"] != os.getpid():
+                    self._l1["entries"].clear()
+                    self._l1["last_id"] = newest[0][0] if newest else b"0-0"
+                    self._l1["origin"] = uuid.uuid4().hex
+                    self._l1["pid"] = os.getpid()
+        return self._l1["origin"]
+
+    def log_invalidation(self, pipeline, *made_keys, clear: bool = False) -> None:
+        """ Добавление измененных ключей в журнал инвалидации в составе pipeline записи. """
+
+        origin = self.origin
+        entries = [{"clear": 1}] if clear else [{"key": made_key} for made_key in made_keys]
+        for entry in entries:
+            entry["origin"] = origin
+            pipeline.xadd(self._log_key, entry, maxlen=self._log_size, approximate=False)
+
+    def poll_invalidations(self) -> None:
+        """ Чтение новых записей журнала инвалидации и удаление измененных ключей из L1. """
+
+        now = time.monotonic()
+        origin = self.origin
+        if now - self._l1["polled_at"] < self._poll_interval:
+            return
+
+        milliseconds, sequence = self._l1["last_id"].split(b"-")
+        entries = self.client.xrange(
+            self._log_key, min=b"%s-%d" % (milliseconds, int(sequence) + 1)
+        )
+        with self._lock:
+            self._l1["polled_at"] = now
+            if not entries:
+                return
+            self._l1["last_id"] = entries[-1][0]
+            # Журнал целиком состоит из новых записей: более старые новые записи могли быть вытеснены.
+            if len(entries) >= self._log_size:
+                self._l1["entries"].clear()
+                return
+            for entry_id, fields in entries:
+                if fields.get(b"origin", b"").decode() == origin:
+                    continue
+                if b"clear" in fields:
+                    self._l1["entries"].clear()
+                    continue
+                self._l1["entries"].pop(fields[b"key"].decode(), None)
+
+    def l1_get(self, key):
+        with self._lock:
+            entry = self._l1["entries"].get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._l1["entries"][key]
+                return None
+            self._l1["entries"].move_to_end(key)
+            return entry[0]
+
+    def l1_set(self, key, data: bytes, timeout=None) -> None:
+        lifetime = self._l1_timeout if timeout is None else min(self._l1_timeout, timeout)
+        with self._lock:
+            self._l1["entries"][key] = (data, time.monotonic() + lifetime)
+            self._l1["entries"].move_to_end(key)
+            while len(self._l1["entries"]) > self._l1_max_entries:
+                self._l1["entries"].popitem(last=False)
+
+    def l1_delete(self, *keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._l1["entries"].pop(key, None)
+
+    # API кеша Django
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        self.poll_invalidations()
+        made_keys = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made_keys[made_key] = key
+
+        found = {}
+        missing = []
+        for made_key, key in made_keys.items():
+            data = self.l1_get(made_key)
+            if data is None:
+                missing.append(made_key)
+            else:
+                found[key] = self.decode(data)
+
+        if missing:
+            pipeline = self.client.pipeline()
+            for made_key in missing:
+                pipeline.get(made_key)
+                pipeline.ttl(made_key)
+            results = pipeline.execute()
+            for made_key, data, ttl in zip(missing, results[::2], results[1::2]):
+                if data is None:
+                    continue
+                self.l1_set(made_key, data, ttl if ttl and ttl > 0 else None)
+                found[made_keys[made_key]] = self.decode(data)
+
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.get_redis_timeout(timeout)
+        encoded = {}
+        for key, value in data.items():
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            encoded[made_key] = self.encode(value)
+
+        pipeline = self.client.pipeline()
+        for made_key, value in encoded.items():
+            if timeout == 0:
+                pipeline.delete(made_key)
+            else:
+                pipeline.set(made_key, value, ex=timeout)
+        self.log_invalidation(pipeline, *encoded)
+        pipeline.execute()
+
+        if timeout == 0:
+            self.l1_delete(*encoded)
+        else:
+            for made_key, value in encoded.items():
+                self.l1_set(made_key, value, timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        timeout = self.get_redis_timeout(timeout)
+        if timeout == 0:
+            return False
+        data = self.encode(value)
+        if not self.client.set(made_key, data, ex=timeout, nx=True):
+            return False
+        pipeline = self.client.pipeline()
+        self.log_invalidation(pipeline, made_key)
+        pipeline.execute()
+        self.l1_set(made_key, data, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        timeout = self.get_redis_timeout(timeout)
+        if timeout is None:
+            touched = self.client.persist(made_key) or self.client.exists(made_key)
+        else:
+            touched = self.client.expire(made_key, timeout)
+        pipeline = self.client.pipeline()
+        self.log_invalidation(pipeline, made_key)
+        pipeline.execute()
+        self.l1_delete(made_key)
+        return bool(touched)
+
+    def delete(self, key, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        pipeline = self.client.pipeline()
+        pipeline.delete(made_key)
+        self.log_invalidation(pipeline, made_key)
+        deleted = pipeline.execute()[0]
+        self.l1_delete(made_key)
+        return bool(deleted)
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        for made_key in made_keys:
+            self.validate_key(made_key)
+        if made_keys:
+            pipeline = self.client.pipeline()
+            pipeline.delete(*made_keys)
+            self.log_invalidation(pipeline, *made_keys)
+            pipeline.execute()
+            self.l1_delete(*made_keys)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def incr(self, key, delta=1, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        if not self.client.exists(made_key):
+            raise ValueError("Key '%s' not found" % key)
+        pipeline = self.client.pipeline()
+        pipeline.incrby(made_key, delta)
+        self.log_invalidation(pipeline, made_key)
+        try:
+            value = pipeline.execute()[0]
+        except Exception:
+            raise ValueError("Key '%s' is not an integer" % key)
+        self.l1_delete(made_key)
+        return value
+
+    def clear(self):
+        """ Удаление записей этого кеша по префиксу ключей, остальные данные Redis не затрагиваются. """
+
+        keys = [
+            key
+            for key in self.client.scan_iter(match=f"{self.key_prefix}:*")
+            if key != self._log_key.encode()
+        ]
+        pipeline = self.client.pipeline()
+        if keys:
+            pipeline.delete(*keys)
+        self.log_invalidation(pipeline, clear=True)
+        pipeline.execute()
+        with self._lock:
+            self._l1["entries"].clear()
@@ -0,0 +1,67 @@
+"""
+Тегированный кеш.
+Каждая запись кеша объявляет теги, от которых она зависит, например 'product:42',
+'categories', 'offers', и хранится вместе с версиями этих тегов на момент расчета.
+Сброс тега - это запись новой версии под ключом тега, после чего все записи,
+сохраненные со старой версией, считаются устаревшими и пересчитываются при чтении.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+def make_tag_key(tag: str) -> str:
+    return f"Cache tag {tag}"
+
+
+def get_tag_versions(tags: Iterable[str], cached: Optional[dict] = None) -> Dict[str, str]:
+    """
+    Получение текущих версий тегов.
+    Для тегов, у которых еще нет версии, версия создается.
+    """
+
+    tag_keys = {tag: make_tag_key(tag) for tag in tags}
+    if cached is None:
+        cached = cache.get_many(list(tag_keys.values()))
+
+    versions = {}
+    missing = {}
+    for tag, tag_key in tag_keys.items():
+        version = cached.get(tag_key)
+        if version is None:
+            version = missing[tag_key] = uuid4().hex
+        versions[tag] = version
+
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def invalidate_tags(*tags: str) -> None:
+    """ Сброс всех записей кеша, зависящих от переданных тегов. """
+
+    cache.set_many({make_tag_key(tag): uuid4().hex for tag in tags}, None)
+
+
+def get_or_set(key: str, default: Any, timeout: Optional[int], tags: Iterable[str]) -> Any:
+    """
+    Получение записи кеша, сохраненной при текущих версиях ее тегов.
+    Запись и версии тегов читаются за одно обращение к кешу.
+    При отсутствии или устаревании запись рассчитывается (default может быть функцией)
+    и сохраняется с версиями тегов, прочитанными до расчета,
+    поэтому сброс тега во время расчета не оставит в кеше устаревших данных.
+    """
+
+    tags = sorted(set(tags))
+    cached = cache.get_many([key, *map(make_tag_key, tags)])
+    versions = get_tag_versions(tags, cached)
+
+    entry = cached.get(key)
+    if entry is not None and entry["tags"] == versions:
+        return entry["value"]
+
+    value = default() if callable(default) else default
+    cache.set(key, {"tags": versions, "value": value}, timeout)
+    return value
@@ -3,4 +3,4 @@ from .models import SiteSettings
 
 def settings(request):
     """Контекст процессор инициализирующий глобальные настройки."""
-    return {"settings": SiteSettings.load()}
+    return {"settings": SiteSettings.load(request)}
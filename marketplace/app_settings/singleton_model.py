@@ -1,8 +1,23 @@
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.db import models
 
+# Кеши, которые видны только своему процессу.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
 
 class SingletonModel(models.Model):
-    """Singleton модель."""
+    """
+    Singleton модель.
+    Экземпляр кешируется и при сохранении заменяется в кеше,
+    дополнительно он может запоминаться на время запроса.
+    Кеш процесса (LocMemCache) при сохранении обновляется только в сохранившем процессе,
+    поэтому в нем экземпляр хранится local_cache_timeout секунд.
+    """
+
+    cache_timeout = 60 * 60 * 24
+    local_cache_timeout = 30
 
     class Meta:
         abstract = True
@@ -10,11 +25,37 @@ class SingletonModel(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super(SingletonModel, self).save(*args, **kwargs)
+        cache.set(self.get_cache_key(), self, self.get_cache_timeout())
 
     def delete(self, using=None, keep_parents=False):
         pass
 
     @classmethod
-    def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
+    def get_cache_key(cls) -> str:
+        return f"Singleton {cls._meta.label}"
+
+    @classmethod
+    def get_cache_timeout(cls) -> int:
+        if isinstance(caches["default"], PROCESS_LOCAL_CACHES):
+            return cls.local_cache_timeout
+        return cls.cache_timeout
+
+    @classmethod
+    def load(cls, request=None):
+        """
+        Получение экземпляра модели.
+        Если передан запрос, экземпляр запоминается в нем,
+        и повторные вызовы в рамках запроса не обращаются даже к кешу.
+        """
+
+        memo = request.__dict__.setdefault("_singletons", {}) if request is not None else {}
+        if cls in memo:
+            return memo[cls]
+
+        obj = cache.get(cls.get_cache_key())
+        if obj is None:
+            obj, created = cls.objects.get_or_create(pk=1)
+            cache.set(cls.get_cache_key(), obj, cls.get_cache_timeout())
+
+        memo[cls] = obj
         return obj
@@ -1,3 +1,108 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import cache_backend
+from .cache_backend import TwoTierRedisCache
+
+
+def make_process_cache(**options) -> TwoTierRedisCache:
+    """
+    Экземпляр кеша с отдельным L1, как в другом процессе.
+    Redis (fakeredis) общий для всех экземпляров.
+    """
+
+    cache_backend._l1_caches.clear()
+    cache_backend._l1_locks.clear()
+    return TwoTierRedisCache(
+        "redis://localhost:6379/15",
+        {
+            "KEY_PREFIX": "test",
+            "OPTIONS": dict(
+                {"CLIENT_CLASS": "fakeredis.FakeRedis", "INVALIDATION_POLL_INTERVAL": 0},
+                **options,
+            ),
+        },
+    )
+
+
+class TwoTierRedisCacheTest(SimpleTestCase):
+    """ Согласованность L1 разных процессов и время жизни записей. """
+
+    def setUp(self):
+        self.writer = make_process_cache()
+        self.reader = make_process_cache()
+        self.writer.client.flushdb()
+
+    def set_behind_l1(self, key, value):
+        """ Запись значения прямо в Redis, без журнала инвалидации. """
+
+        self.writer.client.set(self.writer.make_key(key), self.writer.encode(value))
+
+    def test_write_invalidates_other_process(self):
+        self.writer.set("key", 1)
+        self.assertEqual(self.reader.get("key"), 1)
+
+        self.writer.set("key", 2)
+        self.assertEqual(self.reader.get("key"), 2)
+
+    def test_delete_and_incr_invalidate_other_process(self):
+        self.writer.set("key", 1)
+        self.assertEqual(self.reader.get("key"), 1)
+
+        self.writer.incr("key")
+        self.assertEqual(self.reader.get("key"), 2)
+
+        self.writer.delete("key")
+        self.assertIsNone(self.reader.get("key"))
+
+    def test_unrelated_writes_keep_l1(self):
+        self.writer.set("key", 1)
+        self.assertEqual(self.reader.get("key"), 1)
+
+        self.set_behind_l1("key", 2)
+        self.writer.set("other key", 1)
+        self.writer.delete("another key")
+        self.assertEqual(self.reader.get("key"), 1)
+
+    def test_own_writes_keep_l1(self):
+        self.writer.set("key", 1)
+        self.set_behind_l1("key", 2)
+        self.assertEqual(self.writer.get("key"), 1)
+
+    def test_log_overflow_clears_l1(self):
+        writer = make_process_cache(INVALIDATION_LOG_SIZE=3)
+        reader = make_process_cache(INVALIDATION_LOG_SIZE=3)
+        writer.set("key", 1)
+        self.assertEqual(reader.get("key"), 1)
+
+        self.set_behind_l1("key", 2)
+        for number in range(5):
+            writer.set(f"other key {number}", number)
+        self.assertEqual(reader.get("key"), 2)
+
+    def test_clear_invalidates_other_process(self):
+        self.writer.set("key", 1)
+        self.assertEqual(self.reader.get("key"), 1)
+
+        self.writer.clear()
+        self.assertIsNone(self.reader.get("key"))
+
+    def test_timeout_expires_in_both_tiers(self):
+        self.writer.set("key", 1, timeout=1)
+        self.assertEqual(self.reader.get("key"), 1)
+        self.assertEqual(self.writer.client.ttl(self.writer.make_key("key")), 1)
+
+        time.sleep(1.1)
+        self.assertIsNone(self.writer.get("key"))
+        self.assertIsNone(self.reader.get("key"))
+
+    def test_l1_timeout(self):
+        reader = make_process_cache(L1_TIMEOUT=0.2)
+        self.writer.set("key", 1)
+        self.assertEqual(reader.get("key"), 1)
+
+        self.set_behind_l1("key", 2)
+        self.assertEqual(reader.get("key"), 1)
+        time.sleep(0.3)
+        self.assertEqual(reader.get("key"), 2)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from app_settings import cache_tags
+from .models import Seller
+
+
+@receiver([post_save, post_delete], sender=Seller)
+def seller_changed(sender, instance, **kwargs):
+    """ Сброс кеша страницы продавца и его топ продуктов при изменении продавца. """
+
+    cache_tags.invalidate_tags(f"seller:{instance.pk}")
@@ -7,7 +7,6 @@ from django.contrib.auth.views import (LoginView, LogoutView,
                                        PasswordResetDoneView,
                                        PasswordResetView, PasswordResetCompleteView)
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.cache import cache
 from django.core.mail import send_mail
 from django.db.models import F, Min, Sum
 from django.http import HttpResponseRedirect
@@ -21,6 +20,7 @@ from django.views.generic import CreateView, DetailView, ListView
 from app_basket.models import Cart, CartItem
 from app_merch.models import Offer
 from app_merch.viewed_products import watched_products_service
+from app_settings import cache_tags
 from app_settings.models import SiteSettings
 from app_users.models import Order, OrderItem, Seller
 from .forms import (AvatarUpdateForm, ProfileUpdateForm,
@@ -42,13 +42,13 @@ class CustomLoginView(LoginView):
         cart_username = Cart.objects.filter(
             buyer__profile__user__username=username
         ).first()
-        if not cart_username:
+        if cart_id and not cart_username:
             Cart.objects.filter(id=int(cart_id)).update(
                 buyer=Buyer.objects.create(
                     profile=Profile.objects.get(user__username=username)
                 )
             )
-        if cart_username:
+        elif cart_id:
             cartitems_anonymoususer = CartItem.objects.filter(cart=int(cart_id))
             cartitems_username = CartItem.objects.filter(cart=cart_username.id)
             cartitems_username_offer_ids_list = [
@@ -58,6 +58,7 @@ class CustomLoginView(LoginView):
                 if cartitem.offer.id not in cartitems_username_offer_ids_list:
                     cartitem.cart = cart_username
                     cartitem.save()
+            cart_username.bump_revision()
 
         auth_login(self.request, form.get_user())
         return HttpResponseRedirect(self.get_success_url())
@@ -143,30 +144,32 @@ class SellerView(DetailView):
     context_object_name = "seller"
 
     def get_object(self, queryset=None):
-        time_to_cache = SiteSettings.load().time_to_cache
+        time_to_cache = SiteSettings.load(self.request).time_to_cache
         if not time_to_cache:
             time_to_cache = 1
 
-        return cache.get_or_set(
+        return cache_tags.get_or_set(
             f"Seller {self.kwargs.get('pk')}",
-            super(SellerView, self).get_object(queryset=None),
+            lambda: super(SellerView, self).get_object(queryset=None),
             time_to_cache * 60 * 60 * 24,
+            tags=[f"seller:{self.kwargs.get('pk')}"],
         )
 
     def get_context_data(self, **kwargs):
         context = super(SellerView, self).get_context_data(**kwargs)
         top_seller_products_cache_time = (
-            SiteSettings.load().top_seller_products_cache_time
+            SiteSettings.load(self.request).top_seller_products_cache_time
         )
 
         if not top_seller_products_cache_time:
             top_seller_products_cache_time = 1
-        context["offers"] = cache.get_or_set(
-            f"Seller {kwargs.get('pk')} top products",
-            Offer.objects.filter(seller=self.get_object())
+        context["offers"] = cache_tags.get_or_set(
+            f"Seller {self.object.pk} top products",
+            Offer.objects.filter(seller=self.object)
             .annotate(sales=Sum("order_items__quantity"))
             .order_by("-sales")[:10],
             top_seller_products_cache_time * 60 * 60,
+            tags=[f"seller:{self.object.pk}"],
         )
         return context
 
@@ -152,9 +152,49 @@ LOGIN_REDIRECT_URL = "/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache config: per-process LRU (L1) in front of a shared Redis (L2).
+# Falls back to Django's local-memory cache when REDIS_CACHE_URL is not set.
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL")
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "app_settings.cache_backend.TwoTierRedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "megano",
+            "OPTIONS": {
+                "CLIENT_CLASS": os.getenv("REDIS_CACHE_CLIENT_CLASS", "redis.Redis"),
+                "L1_MAX_ENTRIES": 1000,
+                "L1_TIMEOUT": 5,
+                "INVALIDATION_POLL_INTERVAL": 1,
+                "INVALIDATION_LOG_SIZE": 1000,
+            },
+        }
+    }
+
+# Product view counter: views are buffered in a Redis hash (or in-process
+# when VIEW_COUNTER_REDIS_URL is not set) and flushed to the database
+# every VIEW_COUNTER_FLUSH_INTERVAL seconds.
+VIEW_COUNTER_REDIS_URL = os.getenv("VIEW_COUNTER_REDIS_URL", REDIS_CACHE_URL)
+VIEW_COUNTER_REDIS_CLIENT_CLASS = os.getenv("REDIS_CACHE_CLIENT_CLASS", "redis.Redis")
+VIEW_COUNTER_FLUSH_INTERVAL = 60
+
+# Import jobs that were not updated for IMPORT_JOB_STALE_TIMEOUT seconds
+# (no chunk checkpoint) are marked as failed so they can be resumed.
+IMPORT_JOB_STALE_TIMEOUT = 15 * 60
+
 # Celery config
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
+CELERY_BEAT_SCHEDULE = {
+    "rebuild-catalog-index": {
+        "task": "app_merch.tasks.rebuild_catalog_index",
+        "schedule": 60 * 60,
+    },
+    "flush-product-views": {
+        "task": "app_merch.tasks.flush_product_views",
+        "schedule": VIEW_COUNTER_FLUSH_INTERVAL,
+    },
+}
 
 # FastAPI payment service
 PURCHASE_URL = os.getenv("PURCHASE_URL")